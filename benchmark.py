@@ -0,0 +1,173 @@
+"""Reproducible engine speed benchmark.
+
+Runs every engine on a fixed set of positions (opening, midgame and
+tactical) on each board size and records nodes searched, nodes/sec, time
+to each completed depth and the chosen move. Results are written as JSON
+and can be checked against a stored baseline:
+
+    python benchmark.py --output baseline.json
+    python benchmark.py --baseline baseline.json
+
+Node counts are deterministic for a given engine and position, so a
+changed count means the search itself changed; a drop in nodes/sec beyond
+--tolerance is reported as a speed regression.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+from board import BitBoard
+from players.factory import create_engine
+from utils.constants import HUMAN, AI
+
+SIZES = [5, 7, 9, 11, 13, 15, 19]
+# Runs shorter than this are too noisy to compare nodes/sec on.
+MIN_TIMED_SECONDS = 0.05
+ENGINES = ['minimax:2', 'alphabeta:3', 'alphabeta:4']
+
+# Stones as (row offset, col offset) from the center, alternating black
+# (HUMAN) then white (AI); the engine under test plays white.
+POSITIONS = {
+    'opening': [(0, 0)],
+    'midgame': [
+        (0, 0), (0, 1), (1, 1), (-1, -1), (1, 0), (1, -1),
+        (-1, 1), (2, 0), (0, -1), (-1, 0), (2, 2),
+    ],
+    # Black has an open three on the diagonal and a broken three on the
+    # row; white must find the right defence.
+    'tactical': [
+        (0, 0), (0, 2), (1, 1), (-2, 0), (-1, -1), (2, 1),
+        (0, -1), (3, 3), (0, 1),
+    ],
+}
+
+
+def build_position(name, size):
+    """The named position centered on a size x size board, or None if it does not fit."""
+    center = size // 2
+    board = BitBoard(size)
+    player = HUMAN
+    for dr, dc in POSITIONS[name]:
+        row, col = center + dr, center + dc
+        if not board.is_valid_move(row, col):
+            return None
+        board.push((row, col), player)
+        player = AI if player == HUMAN else HUMAN
+    if board.is_game_over():
+        return None
+    if player != AI:
+        # The engines search for AI, which must be the side to move.
+        board = board.swapped()
+    return board
+
+
+def run_case(spec, name, size):
+    board = build_position(name, size)
+    if board is None:
+        return None
+    engine = create_engine(spec)
+    start = time.perf_counter()
+    move = engine.get_move(board)
+    elapsed = time.perf_counter() - start
+    stats = engine.stats
+    nodes = stats.nodes
+    return {
+        'engine': spec,
+        'position': name,
+        'size': size,
+        'move': list(move) if move else None,
+        'nodes': nodes,
+        'seconds': elapsed,
+        'nodes_per_second': nodes / elapsed if elapsed > 0 else None,
+        'completed_depth': stats.completed_depth,
+        'leaf_evaluations': stats.leaf_evaluations,
+        'cutoffs': stats.cutoffs,
+        'depths': [
+            {'depth': it['depth'], 'seconds': it['time'], 'nodes': it['total_nodes']}
+            for it in stats.depths
+        ],
+    }
+
+
+def run(engines, sizes, positions, repeat=1):
+    results = []
+    for spec in engines:
+        for size in sizes:
+            for name in positions:
+                best = None
+                # Keep the fastest repetition to damp timing noise; node
+                # counts are identical across repetitions.
+                for _ in range(repeat):
+                    result = run_case(spec, name, size)
+                    if result is None:
+                        break
+                    if best is None or result['seconds'] < best['seconds']:
+                        best = result
+                if best is not None:
+                    results.append(best)
+                    print(
+                        f"{spec:<16}{name:<10}{size:>4}  move={tuple(best['move']) if best['move'] else None}"
+                        f"  nodes={best['nodes']:<9}  {best['seconds']:.3f}s", flush=True
+                    )
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Differences from a baseline run, as a list of human-readable strings."""
+    previous = {(r['engine'], r['position'], r['size']): r for r in baseline['results']}
+    problems = []
+    for result in results:
+        key = (result['engine'], result['position'], result['size'])
+        old = previous.get(key)
+        if old is None:
+            continue
+        label = f"{key[0]} {key[1]} {key[2]}x{key[2]}"
+        if result['move'] != old['move']:
+            problems.append(f"{label}: move changed {old['move']} -> {result['move']}")
+        if result['nodes'] != old['nodes']:
+            problems.append(f"{label}: nodes changed {old['nodes']} -> {result['nodes']}")
+        old_nps = old.get('nodes_per_second')
+        new_nps = result.get('nodes_per_second')
+        timed = min(result['seconds'], old['seconds']) >= MIN_TIMED_SECONDS
+        if timed and old_nps and new_nps and new_nps < old_nps * (1 - tolerance):
+            problems.append(f"{label}: nodes/sec dropped {old_nps:.0f} -> {new_nps:.0f}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Gomoku engines.")
+    parser.add_argument('--engines', nargs='+', default=ENGINES, help="engine specs, type:depth[:seconds]")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help="board sizes")
+    parser.add_argument('--positions', nargs='+', default=list(POSITIONS), choices=list(POSITIONS))
+    parser.add_argument('--repeat', type=int, default=3, help="runs per case; the fastest is kept")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="compare against the results in this JSON file")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed fractional drop in nodes/sec before it counts as a regression")
+    args = parser.parse_args(argv)
+
+    results = run(args.engines, args.sizes, args.positions, args.repeat)
+    report = {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        problems = compare(results, baseline, args.tolerance)
+        for problem in problems:
+            print(problem)
+        if problems:
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,196 @@
 from utils.constants import EMPTY, HUMAN, AI, WIN_LENGTH
+from utils.evaluator import IncrementalEvaluator
+from utils.zobrist import zobrist_table
 
-class GomokuBoard:
-    def __init__(self, size):
+DIRECTIONS = [(1, 0), (0, 1), (1, 1), (1, -1)]
+CANDIDATE_RADIUS = 2
+
+_neighbourhoods = {}
+
+def neighbourhood(size, radius):
+    """For each cell index, the indices of the other cells within `radius`."""
+    if (size, radius) not in _neighbourhoods:
+        cells = []
+        for i in range(size):
+            for j in range(size):
+                cells.append([
+                    x * size + y
+                    for x in range(max(0, i - radius), min(size, i + radius + 1))
+                    for y in range(max(0, j - radius), min(size, j + radius + 1))
+                    if (x, y) != (i, j)
+                ])
+        _neighbourhoods[(size, radius)] = cells
+    return _neighbourhoods[(size, radius)]
+
+
+class BaseBoard:
+    """Behaviour shared by every board backend.
+
+    Subclasses store the stones and implement get(), _place() and _remove().
+    Engines make and undo moves through push()/pop() instead of writing
+    into the grid, so each backend can keep its own representation.
+
+    A five can only be created by the stone just placed, so push() only
+    looks at the four lines through that stone and caches the result in
+    `winner`. The evaluation windows are updated the same way through
+    `evaluator`, and `hash` holds the Zobrist key of the position.
+    The set of empty cells within `candidate_radius` of a stone is kept
+    the same way for get_candidate_moves().
+    Positions written into the storage directly must call
+    rescan() to rebuild the cached state with a full-board scan.
+    """
+
+    incremental_win_check = True
+
+    def __init__(self, size, candidate_radius=CANDIDATE_RADIUS):
         self.size = size
-        self.board = [['.' for _ in range(size)] for _ in range(size)]
+        self.candidate_radius = candidate_radius
+        self.moves = []
+        self.count = 0
+        self.winner = None
+        self._win_ply = None
+        self.evaluator = IncrementalEvaluator(size)
+        self.zobrist = zobrist_table(size)
+        self.hash = 0
+        self.neighbours = neighbourhood(size, candidate_radius)
+        self.occupied = bytearray(size * size)
+        self.near = [0] * (size * size)
+        self.candidates = set()
+
+    def get(self, row, col):
+        raise NotImplementedError
+
+    def _place(self, row, col, player):
+        raise NotImplementedError
+
+    def _remove(self, row, col, player):
+        raise NotImplementedError
+
+    def push(self, move, player):
+        row, col = move
+        self._place(row, col, player)
+        self.moves.append((row, col, player))
+        self.count += 1
+        self.evaluator.add(row, col, player)
+        index = row * self.size + col
+        self.hash ^= self.zobrist[player][index]
+        self._add_candidates(index)
+        if self.winner is None and self.makes_five(row, col, player):
+            self.winner = player
+            self._win_ply = len(self.moves)
+
+    def pop(self):
+        row, col, player = self.moves.pop()
+        self._remove(row, col, player)
+        self.count -= 1
+        self.evaluator.remove(row, col, player)
+        index = row * self.size + col
+        self.hash ^= self.zobrist[player][index]
+        self._remove_candidates(index)
+        if self._win_ply is not None and len(self.moves) < self._win_ply:
+            self.winner = None
+            self._win_ply = None
+            if len(self.moves) < self.count:
+                # The win predates the move stack, so the cache cannot be
+                # unwound move by move.
+                self.rescan()
+        return (row, col)
+
+    def _add_candidates(self, index):
+        near = self.near
+        occupied = self.occupied
+        candidates = self.candidates
+        occupied[index] = 1
+        candidates.discard(index)
+        for cell in self.neighbours[index]:
+            near[cell] += 1
+            if not occupied[cell]:
+                candidates.add(cell)
+
+    def _remove_candidates(self, index):
+        near = self.near
+        candidates = self.candidates
+        self.occupied[index] = 0
+        for cell in self.neighbours[index]:
+            near[cell] -= 1
+            if not near[cell]:
+                candidates.discard(cell)
+        if near[index]:
+            candidates.add(index)
+
+    def get_candidate_moves(self):
+        """Empty cells near existing stones, in row-major order.
+
+        On an empty board the center is the only candidate.
+        """
+        if not self.count:
+            center = self.size // 2
+            return [(center, center)]
+        return [divmod(index, self.size) for index in sorted(self.candidates)]
+
+    def set_candidate_radius(self, radius):
+        self.candidate_radius = radius
+        self.neighbours = neighbourhood(self.size, radius)
+        self.rescan()
+
+    def makes_five(self, row, col, player):
+        """True if the stone of `player` at (row, col) lies on a five."""
+        for dx, dy in DIRECTIONS:
+            count = 1
+            for sign in (1, -1):
+                x, y = row + sign * dx, col + sign * dy
+                while 0 <= x < self.size and 0 <= y < self.size and self.get(x, y) == player:
+                    count += 1
+                    x += sign * dx
+                    y += sign * dy
+            if count >= WIN_LENGTH:
+                return True
+        return False
+
+    def get_winning_cells(self):
+        """The cells of the line the winning move completed, or [] if nobody has won."""
+        if self.winner is None or not self._win_ply or self._win_ply > len(self.moves):
+            return []
+        row, col, player = self.moves[self._win_ply - 1]
+        for dx, dy in DIRECTIONS:
+            cells = [(row, col)]
+            for sign in (1, -1):
+                x, y = row + sign * dx, col + sign * dy
+                while 0 <= x < self.size and 0 <= y < self.size and self.get(x, y) == player:
+                    cells.append((x, y))
+                    x += sign * dx
+                    y += sign * dy
+            if len(cells) >= WIN_LENGTH:
+                return sorted(cells)
+        return []
+
+    def rescan(self):
+        """Rebuild the cached state from the stones with a full-board scan."""
+        stones = self.stones()
+        self.count = len(stones)
+        self.evaluator.reset()
+        self.hash = 0
+        self.occupied = bytearray(self.size * self.size)
+        self.near = [0] * (self.size * self.size)
+        self.candidates = set()
+        for row, col, player in stones:
+            self.evaluator.add(row, col, player)
+            self.hash ^= self.zobrist[player][row * self.size + col]
+            self._add_candidates(row * self.size + col)
+        self.winner = None
+        self._win_ply = None
+        for player in (HUMAN, AI):
+            if self.scan_winner(player):
+                self.winner = player
+                self._win_ply = len(self.moves)
+                break
+
+    def is_game_over(self):
+        return self.winner is not None or self.is_full()
 
     def make_move(self, row, col, player):
         if self.is_valid_move(row, col):
-            self.board[row][col] = player
+            self.push((row, col), player)
             return True
         return False
 
@@ -15,28 +198,31 @@ class GomokuBoard:
         return (
             0 <= row < self.size and
             0 <= col < self.size and
-            self.board[row][col] == EMPTY
+            self.get(row, col) == EMPTY
         )
 
     def get_available_moves(self):
-        return [(i, j) for i in range(self.size) for j in range(self.size) if self.board[i][j] == EMPTY]
+        return [(i, j) for i in range(self.size) for j in range(self.size) if self.get(i, j) == EMPTY]
 
     def is_full(self):
-        return all(cell != EMPTY for row in self.board for cell in row)
+        return self.count == self.size * self.size
 
     def check_winner(self, player):
-        directions = [(1, 0), (0, 1), (1, 1), (1, -1)]
+        if self.incremental_win_check:
+            return self.winner == player
+        return self.scan_winner(player)
 
+    def scan_winner(self, player):
         for i in range(self.size):
             for j in range(self.size):
-                if self.board[i][j] == player:
-                    for dx, dy in directions:
+                if self.get(i, j) == player:
+                    for dx, dy in DIRECTIONS:
                         count = 1
                         x, y = i + dx, j + dy
                         while (
                             0 <= x < self.size and
                             0 <= y < self.size and
-                            self.board[x][y] == player
+                            self.get(x, y) == player
                         ):
                             count += 1
                             x += dx
@@ -45,10 +231,187 @@ class GomokuBoard:
                                 return True
         return False
 
+    def stones(self):
+        return [(i, j, self.get(i, j)) for i in range(self.size) for j in range(self.size) if self.get(i, j) != EMPTY]
+
+    def copy(self):
+        return type(self).from_board(self)
+
+    @classmethod
+    def from_board(cls, other, candidate_radius=None):
+        """Build a board of this backend holding the same position as `other`.
+
+        The move stack is replayed when it accounts for every stone, so the
+        copy keeps the game order; otherwise the stones are loaded row by row.
+        """
+        if candidate_radius is None:
+            candidate_radius = other.candidate_radius
+        new = cls(other.size, candidate_radius)
+        stones = other.stones()
+        if len(other.moves) == len(stones):
+            for row, col, player in other.moves:
+                new.push((row, col), player)
+        else:
+            for row, col, player in stones:
+                new.push((row, col), player)
+        return new
+
+    def swapped(self):
+        """Copy of this board with the two colours exchanged.
+
+        The engines always search for AI; giving them the swapped board
+        lets them play the HUMAN stones instead.
+        """
+        new = type(self)(self.size, self.candidate_radius)
+        other = {HUMAN: AI, AI: HUMAN}
+        stones = self.stones()
+        source = self.moves if len(self.moves) == len(stones) else stones
+        for row, col, player in source:
+            new.push((row, col), other[player])
+        return new
+
     def display(self):
         print("  " + " ".join(f"{i:2}" for i in range(self.size)))
-        for idx, row in enumerate(self.board):
-            print(f"{idx:2} " + " ".join(row))
+        for idx in range(self.size):
+            print(f"{idx:2} " + " ".join(self.get(idx, j) for j in range(self.size)))
+
+
+class GomokuBoard(BaseBoard):
+    """The original list-of-lists board, used by the GUI."""
+
+    def __init__(self, size, candidate_radius=CANDIDATE_RADIUS):
+        super().__init__(size, candidate_radius)
+        self.board = [['.' for _ in range(size)] for _ in range(size)]
+
+    def get(self, row, col):
+        return self.board[row][col]
+
+    def _place(self, row, col, player):
+        self.board[row][col] = player
+
+    def _remove(self, row, col, player):
+        self.board[row][col] = EMPTY
+
+    def get_available_moves(self):
+        return [(i, j) for i in range(self.size) for j in range(self.size) if self.board[i][j] == EMPTY]
+
+    def position_key(self):
+        return tuple(''.join(row) for row in self.board)
+
+
+class BitBoard(BaseBoard):
+    """Board stored as one integer bitmask per player.
+
+    Cell (row, col) maps to bit row * (size + 1) + col. The extra padding
+    column is always empty, which stops horizontal and diagonal shifts from
+    wrapping onto the next row, so a whole-board five-in-a-row test is a
+    handful of shift-and operations.
+    """
+
+    def __init__(self, size, candidate_radius=CANDIDATE_RADIUS):
+        super().__init__(size, candidate_radius)
+        self.stride = size + 1
+        self.masks = {HUMAN: 0, AI: 0}
+        self.shifts = (self.stride, 1, self.stride + 1, self.stride - 1)
+        self.full_mask = 0
+        for i in range(size):
+            self.full_mask |= ((1 << size) - 1) << (i * self.stride)
+
+    def get(self, row, col):
+        bit = 1 << (row * self.stride + col)
+        if self.masks[HUMAN] & bit:
+            return HUMAN
+        if self.masks[AI] & bit:
+            return AI
+        return EMPTY
+
+    def _place(self, row, col, player):
+        self.masks[player] |= 1 << (row * self.stride + col)
+
+    def _remove(self, row, col, player):
+        self.masks[player] &= ~(1 << (row * self.stride + col))
+
+    @property
+    def board(self):
+        grid = [[EMPTY] * self.size for _ in range(self.size)]
+        for row, col, player in self.stones():
+            grid[row][col] = player
+        return grid
+
+    def is_valid_move(self, row, col):
+        return (
+            0 <= row < self.size and
+            0 <= col < self.size and
+            not (self.masks[HUMAN] | self.masks[AI]) >> (row * self.stride + col) & 1
+        )
+
+    def get_available_moves(self):
+        empty = self.full_mask & ~(self.masks[HUMAN] | self.masks[AI])
+        moves = []
+        while empty:
+            low = empty & -empty
+            index = low.bit_length() - 1
+            moves.append(divmod(index, self.stride))
+            empty ^= low
+        return moves
+
+    def makes_five(self, row, col, player):
+        mask = self.masks[player]
+        index = row * self.stride + col
+        for shift in self.shifts:
+            count = 1
+            bit = index + shift
+            while count < WIN_LENGTH and mask >> bit & 1:
+                count += 1
+                bit += shift
+            bit = index - shift
+            while count < WIN_LENGTH and bit >= 0 and mask >> bit & 1:
+                count += 1
+                bit -= shift
+            if count >= WIN_LENGTH:
+                return True
+        return False
+
+    def scan_winner(self, player):
+        mask = self.masks[player]
+        for shift in self.shifts:
+            run = mask
+            for _ in range(WIN_LENGTH - 1):
+                run &= run >> shift
+                if not run:
+                    break
+            if run:
+                return True
+        return False
+
+    def stones(self):
+        result = []
+        for player in (HUMAN, AI):
+            mask = self.masks[player]
+            while mask:
+                low = mask & -mask
+                row, col = divmod(low.bit_length() - 1, self.stride)
+                result.append((row, col, player))
+                mask ^= low
+        result.sort()
+        return result
+
+    def copy(self):
+        new = BitBoard(self.size, self.candidate_radius)
+        new.masks = dict(self.masks)
+        new.count = self.count
+        new.moves = list(self.moves)
+        new.winner = self.winner
+        new._win_ply = self._win_ply
+        new.evaluator = self.evaluator.copy()
+        new.hash = self.hash
+        new.occupied = bytearray(self.occupied)
+        new.near = list(self.near)
+        new.candidates = set(self.candidates)
+        return new
+
+    def position_key(self):
+        return (self.masks[HUMAN], self.masks[AI])
 
 
 def is_win(board, player):
@@ -0,0 +1,2 @@
+# Lets the tests import the top-level modules (board, players, utils)
+# when pytest is run from the repository root.
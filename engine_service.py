@@ -0,0 +1,435 @@
+"""Headless engine service.
+
+Serves searches to other programs without the GUI, either as JSON lines
+over stdio or a local socket, or as a Gomocup brain (the piskvork
+protocol) over stdio:
+
+    python engine_service.py --stdio
+    python engine_service.py --port 7600
+    python engine_service.py --socket /tmp/gomoku.sock
+    python engine_service.py --gomocup
+
+JSON requests are one object per line; every request names a session (one
+game) and the response carries the request's id:
+
+    {"id": 1, "session": "g1", "command": "move", "size": 15,
+     "moves": [[7, 7], [7, 8]], "engine": "alphabeta:10", "time": 1.0}
+    {"id": 1, "move": [8, 8], "score": 35, "depth": 4, "nodes": 51234, ...}
+
+`moves` is the whole game so far, black first, and the engine moves for
+the side to move. Other commands are "end" (drop the session) and
+"stats". Requests are handled concurrently and responses may come back
+out of order.
+
+Searches run in a pool of worker processes. Each session always goes to
+the same worker, which keeps its engine, so the transposition table and
+search trees carry over from one move of a game to the next. The
+engines' caches count against a memory cap, split over the workers, and
+the least recently used sessions are dropped to stay under it.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import math
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import zlib
+from collections import OrderedDict
+
+from board import BitBoard
+from players.factory import create_engine
+from utils.constants import AI, HUMAN
+from utils.transposition import TranspositionTable
+
+DEFAULT_ENGINE = 'alphabeta:10'
+DEFAULT_TIME = 5.0
+SESSION_TT_MB = 16
+MEMORY_MB = 1024
+# Rough CPython cost of one MCTS tree node.
+NODE_BYTES = 250
+ABOUT = 'name="Gomoku", version="1.0", country="EG"'
+
+
+class Session:
+    """The engine of one game, kept between its moves."""
+
+    def __init__(self, spec, tt_mb=SESSION_TT_MB):
+        self.spec = spec
+        self.engine = create_engine(spec)
+        if hasattr(self.engine, 'tt'):
+            self.engine.tt = TranspositionTable(tt_mb)
+        self.searches = 0
+
+    def memory(self):
+        """Estimated bytes held by the engine's caches."""
+        engine = self.engine
+        total = 0
+        if hasattr(engine, 'tt'):
+            total += engine.tt.size_mb * 1024 * 1024
+        if getattr(engine, 'root', None) is not None:
+            total += engine.root.visits * NODE_BYTES
+        return total
+
+    def search(self, size, moves, time_limit=None):
+        """Search the position after `moves` (black first) for the side to move."""
+        board = BitBoard(size)
+        player = HUMAN
+        for row, col in moves:
+            if not board.is_valid_move(row, col):
+                raise ValueError(f"illegal move {row},{col}")
+            board.push((row, col), player)
+            player = AI if player == HUMAN else HUMAN
+        if board.is_game_over():
+            raise ValueError("the game is over")
+        # Engines search for AI, so black sees the board with colours swapped.
+        view = board if player == AI else board.swapped()
+        if time_limit is not None:
+            self.engine.time_limit = time_limit
+        self.engine.clear_stop()
+        move = self.engine.get_move(view)
+        self.searches += 1
+        stats = self.engine.stats
+        score = stats.score
+        return {
+            'move': list(move) if move is not None else None,
+            # JSON has no infinities.
+            'score': score if score is None or math.isfinite(score) else None,
+            'depth': stats.completed_depth,
+            'nodes': stats.nodes,
+            'time': stats.elapsed,
+            'pv': [list(m) for m in stats.pv],
+            'book': stats.book,
+            'forced': stats.forced,
+        }
+
+
+class SessionCache:
+    """Sessions by id, least recently used first, within a memory budget."""
+
+    def __init__(self, memory_cap, tt_mb=SESSION_TT_MB):
+        self.memory_cap = memory_cap
+        self.tt_mb = tt_mb
+        self.sessions = OrderedDict()
+        self.evictions = 0
+
+    def get(self, session_id, spec):
+        session = self.sessions.get(session_id)
+        if session is None or session.spec != spec:
+            session = Session(spec, self.tt_mb)
+            self.sessions[session_id] = session
+        self.sessions.move_to_end(session_id)
+        return session
+
+    def end(self, session_id):
+        return self.sessions.pop(session_id, None) is not None
+
+    def memory(self):
+        return sum(session.memory() for session in self.sessions.values())
+
+    def evict(self):
+        """Drop least recently used sessions until under the cap; the latest one is always kept."""
+        while len(self.sessions) > 1 and self.memory() > self.memory_cap:
+            self.sessions.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        return {'sessions': len(self.sessions), 'memory': self.memory(), 'evictions': self.evictions}
+
+
+# Worker-process state, set up once per process by _init_worker.
+_cache = None
+
+
+def _init_worker(memory_cap, tt_mb):
+    global _cache
+    _cache = SessionCache(memory_cap, tt_mb)
+
+
+def handle_request(request, cache=None):
+    """Response dict for one JSON request, run in the session's worker."""
+    cache = cache or _cache
+    response = {'id': request.get('id')}
+    try:
+        command = request.get('command', 'move')
+        if command == 'move':
+            session = cache.get(request['session'], request.get('engine', DEFAULT_ENGINE))
+            response.update(session.search(request['size'], request.get('moves', []),
+                                           request.get('time', DEFAULT_TIME)))
+            cache.evict()
+        elif command == 'end':
+            response['ended'] = cache.end(request['session'])
+        elif command == 'stats':
+            response.update(cache.stats())
+        else:
+            raise ValueError(f"unknown command {command!r}")
+    except KeyError as e:
+        response['error'] = f"missing field {e}"
+    except (TypeError, ValueError) as e:
+        response['error'] = str(e)
+    except Exception as e:
+        # Any other bad field (e.g. "engine": 5) still gets an answer.
+        response['error'] = f"{type(e).__name__}: {e}"
+    return response
+
+
+class EngineService:
+    """Dispatches JSON requests to worker processes, one worker per session.
+
+    Every worker is a single-process executor, so the requests of a
+    session run one at a time, in order, in the process holding its engine.
+    """
+
+    def __init__(self, workers=None, memory_mb=MEMORY_MB, tt_mb=SESSION_TT_MB):
+        workers = workers or os.cpu_count() or 1
+        memory_cap = memory_mb * 1024 * 1024 // workers
+        # Forked workers would inherit the client sockets accepted before
+        # they start and keep those connections open.
+        context = multiprocessing.get_context('spawn')
+        self.executors = [
+            concurrent.futures.ProcessPoolExecutor(
+                1, mp_context=context, initializer=_init_worker, initargs=(memory_cap, tt_mb),
+            )
+            for _ in range(workers)
+        ]
+
+    def _executor(self, session_id):
+        return self.executors[zlib.crc32(str(session_id).encode()) % len(self.executors)]
+
+    async def handle(self, request):
+        loop = asyncio.get_running_loop()
+        if request.get('command') == 'stats':
+            parts = await asyncio.gather(*[
+                loop.run_in_executor(executor, handle_request, request) for executor in self.executors
+            ])
+            return {
+                'id': request.get('id'),
+                'workers': len(parts),
+                'sessions': sum(part['sessions'] for part in parts),
+                'memory': sum(part['memory'] for part in parts),
+                'evictions': sum(part['evictions'] for part in parts),
+            }
+        if 'session' not in request:
+            return {'id': request.get('id'), 'error': "missing field 'session'"}
+        return await loop.run_in_executor(self._executor(request['session']), handle_request, request)
+
+    async def handle_line(self, line):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("a request must be a JSON object")
+        except ValueError as e:
+            return {'id': None, 'error': f"bad request: {e}"}
+        try:
+            return await self.handle(request)
+        except Exception as e:
+            # E.g. a worker that died, or a session id that cannot be hashed.
+            return {'id': request.get('id'), 'error': f"{type(e).__name__}: {e}"}
+
+    async def serve_stream(self, reader, write):
+        """Answer the requests read from `reader`, passing each response line to write()."""
+        pending = set()
+
+        async def answer(line):
+            write(json.dumps(await self.handle_line(line)) + '\n')
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.strip():
+                task = asyncio.create_task(answer(line.decode()))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.gather(*pending)
+
+    def close(self):
+        for executor in self.executors:
+            executor.shutdown(cancel_futures=True)
+
+
+class GomocupBrain:
+    """The Gomocup (piskvork) brain protocol over one game.
+
+    Coordinates are "x,y" with x the column. The brain plays the AI stones;
+    the manager's INFO timeout_turn (milliseconds) sets the time per move
+    and max_memory caps the transposition table.
+    """
+
+    def __init__(self, spec=DEFAULT_ENGINE, tt_mb=SESSION_TT_MB):
+        self.spec = spec
+        self.tt_mb = tt_mb
+        self.time_limit = DEFAULT_TIME
+        self.session = None
+        self.board = None
+        self.board_lines = None
+        self.ended = False
+
+    def _new_game(self, size):
+        self.board = BitBoard(size)
+        self.session = Session(self.spec, self.tt_mb)
+        self.session.engine.time_limit = self.time_limit
+
+    def _think(self):
+        start = time.time()
+        move = self.session.engine.get_move(self.board)
+        if move is None:
+            return 'ERROR no move'
+        self.board.push(move, AI)
+        self.session.searches += 1
+        return f'MESSAGE searched {self.session.engine.stats.nodes} nodes in {time.time() - start:.2f}s\n' \
+               f'{move[1]},{move[0]}'
+
+    def _parse(self, text):
+        col, row = (int(value) for value in text.split(',')[:2])
+        return row, col
+
+    def _cell(self, text):
+        row, col = self._parse(text)
+        if not self.board.is_valid_move(row, col):
+            raise ValueError(f"illegal move {text}")
+        return row, col
+
+    def handle(self, line):
+        """The reply to one input line, or None when nothing is to be sent."""
+        line = line.strip()
+        if not line:
+            return None
+        if self.board_lines is not None:
+            if line.upper() != 'DONE':
+                self.board_lines.append(line)
+                return None
+            lines, self.board_lines = self.board_lines, None
+            size = self.board.size
+            self._new_game(size)
+            for entry in lines:
+                col, row, field = (int(value) for value in entry.split(','))
+                self.board.push((row, col), AI if field == 1 else HUMAN)
+            return self._think()
+
+        command, _, argument = line.partition(' ')
+        command = command.upper()
+        try:
+            if command == 'START':
+                size = int(argument)
+                if size < 5:
+                    return 'ERROR unsupported size'
+                self._new_game(size)
+                return 'OK'
+            if self.board is None and command in ('RESTART', 'BEGIN', 'TURN', 'BOARD', 'TAKEBACK'):
+                return 'ERROR no START'
+            if command == 'RESTART':
+                self._new_game(self.board.size)
+                return 'OK'
+            if command == 'BEGIN':
+                return self._think()
+            if command == 'TURN':
+                self.board.push(self._cell(argument), HUMAN)
+                return self._think()
+            if command == 'BOARD':
+                self.board_lines = []
+                return None
+            if command == 'TAKEBACK':
+                if not self.board.moves or self.board.moves[-1][:2] != self._parse(argument):
+                    return 'ERROR can only take back the last move'
+                self.board.pop()
+                return 'OK'
+            if command == 'INFO':
+                key, _, value = argument.partition(' ')
+                if key == 'timeout_turn' and int(value) > 0:
+                    self.time_limit = max(0.05, int(value) / 1000 * 0.9)
+                    if self.session is not None:
+                        self.session.engine.time_limit = self.time_limit
+                elif key == 'max_memory' and int(value) > 0:
+                    self.tt_mb = max(1, min(self.tt_mb, int(value) // (4 * 1024 * 1024)))
+                return None
+            if command == 'ABOUT':
+                return ABOUT
+            if command == 'END':
+                self.ended = True
+                return None
+        except ValueError as e:
+            return f'ERROR {e}'
+        return f'UNKNOWN {command}'
+
+
+async def _stdin_reader():
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    return reader
+
+
+def _write_stdout(text):
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+async def run_gomocup(spec):
+    brain = GomocupBrain(spec)
+    reader = await _stdin_reader()
+    loop = asyncio.get_running_loop()
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        # Searches run off the event loop thread.
+        reply = await loop.run_in_executor(None, brain.handle, line.decode())
+        if reply:
+            _write_stdout(reply + '\n')
+        if brain.ended:
+            break
+
+
+async def run_service(args):
+    service = EngineService(args.workers, args.memory_mb, args.tt_mb)
+    # Shut the workers down on a kill too, not just on end of input.
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    try:
+        if args.port is not None or args.socket:
+            async def client(reader, writer):
+                await service.serve_stream(reader, lambda text: writer.write(text.encode()))
+                await writer.drain()
+                writer.close()
+
+            if args.socket:
+                server = await asyncio.start_unix_server(client, path=args.socket)
+            else:
+                server = await asyncio.start_server(client, '127.0.0.1', args.port)
+            async with server:
+                await server.serve_forever()
+        else:
+            await service.serve_stream(await _stdin_reader(), _write_stdout)
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Gomoku engine searches over JSON or the Gomocup protocol.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--stdio', action='store_true', help="JSON lines over stdin/stdout (the default)")
+    mode.add_argument('--port', type=int, help="JSON lines over TCP on 127.0.0.1:PORT")
+    mode.add_argument('--socket', help="JSON lines over a unix socket at this path")
+    mode.add_argument('--gomocup', action='store_true', help="act as a Gomocup brain over stdin/stdout")
+    parser.add_argument('--engine', default=DEFAULT_ENGINE, help="engine spec of the Gomocup brain")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument('--memory-mb', type=int, default=MEMORY_MB, help="cap on the sessions' caches")
+    parser.add_argument('--tt-mb', type=int, default=SESSION_TT_MB, help="transposition table per session")
+    args = parser.parse_args(argv)
+
+    create_engine(args.engine)
+    try:
+        if args.gomocup:
+            asyncio.run(run_gomocup(args.engine))
+        else:
+            asyncio.run(run_service(args))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,34 @@
+import os
+import time
 import tkinter as tk
 from tkinter import messagebox, ttk
 from board import GomokuBoard
 from players.human import HumanPlayer
 from players.minimax_ai import MinimaxAI
 from players.alphabeta_ai import AlphaBetaAI
-from utils.constants import HUMAN, AI, EMPTY
+from players.mcts_ai import MCTSAI
+from players.pvs_ai import PVSAI
+from utils.analysis import MoveAnalyzer, heat
+from utils.background_search import BackgroundSearch
+from utils.board_canvas import BoardCanvas
+from utils.constants import HUMAN, AI
+from utils.game_record import DRAW, GameRecord, GameRecordWriter
+from utils.opening_book import OpeningBook
+from utils.solver import SolvedTable
+
+# Wall-clock budget per AI move in seconds; the depth setting is a cap.
+AI_TIME_LIMIT = 5
+# How often the Tk loop checks for a finished background search.
+SEARCH_POLL_MS = 50
+# Every game played in the window is appended to this record file.
+GAME_RECORD_PATH = os.path.join('games', 'gui.gmr')
+# Deepest analysis of a position; it runs until the position changes.
+ANALYSIS_DEPTH = 8
 
 class GomokuGame:
-    def __init__(self, root, size=5, game_mode="Human vs AI", ai1_type="AlphaBeta", ai1_depth=2, ai2_type="AlphaBeta", ai2_depth=2):
+    def __init__(self, root, size=5, game_mode="Human vs AI", ai1_type="AlphaBeta", ai1_depth=2, ai2_type="AlphaBeta", ai2_depth=2, ai_time_limit=AI_TIME_LIMIT, ponder=True):
         self.root = root
+        self.ai_time_limit = ai_time_limit
         self.root.title("✨ Gomoku Game")
         self.root.configure(bg="#f8f9fa")
         
@@ -18,11 +38,9 @@ class GomokuGame:
         # Make the window resizable
         self.root.resizable(True, True)
         
-        # Configure grid to be responsive
-        for i in range(size + 2):  # +2 for title and status bar
-            self.root.grid_rowconfigure(i, weight=1)
-        for i in range(size):
-            self.root.grid_columnconfigure(i, weight=1)
+        # Configure grid to be responsive: the board takes any extra space
+        self.root.grid_rowconfigure(1, weight=1)
+        self.root.grid_columnconfigure(0, weight=1)
         
         self.board = GomokuBoard(size)
         self.human_player = HumanPlayer()
@@ -36,9 +54,32 @@ class GomokuGame:
         else:
             self.current_player = HUMAN
         self.size = size
-        self.buttons = {}
         self.game_active = True
         self.game_mode = game_mode
+
+        # Moves and their thinking times, saved when the game ends.
+        players = {
+            "Human vs AI": ("human", f"{ai1_type.lower()}:{ai1_depth}"),
+            "AI vs AI": (f"{ai1_type.lower()}:{ai1_depth}", f"{ai2_type.lower()}:{ai2_depth}"),
+        }.get(game_mode, ("human", "human"))
+        self.record = GameRecord(size, *players, {'mode': game_mode, 'time_limit': ai_time_limit})
+        self.record_saved = False
+        self.turn_started = time.time()
+
+        # AI searches run in a worker thread so the window stays responsive.
+        # While the human thinks, the AI can ponder: search the reply it
+        # expects and reuse that search if the human plays it.
+        self.search = BackgroundSearch()
+        self.ponder = ponder and game_mode == "Human vs AI"
+        self.ponder_move = None
+        self.ponder_result = None
+        self.waiting_for_ponder = False
+        # Analysis mode scores every move for the player to move and
+        # overlays the scores on the board, refined as each depth completes.
+        self.analysis_search = BackgroundSearch()
+        self.analyzer = MoveAnalyzer(ANALYSIS_DEPTH)
+        self.analysis_var = tk.BooleanVar(value=False)
+        self.poll_search()
         
         # Beautiful color palette
         self.colors = {
@@ -57,12 +98,18 @@ class GomokuGame:
             'button_disabled': '#b2bec3',
             'stone_bg': '#dfe6e9',
             'board_bg': '#dfe6e9',
-            'stone_shadow': '#636e72'
+            'stone_shadow': '#636e72',
+            'human_stone': '#2d3436',
+            'ai_stone': '#a55eea',
+            'last_move': '#e17055',
+            'heat_best': '#55efc4',
+            'heat_worst': '#ff7675',
+            'heat_text': '#2d3436'
         }
         
         # Title Frame with gradient effect
         title_frame = tk.Frame(self.root, bg=self.colors['title_bg'])
-        title_frame.grid(row=0, column=0, columnspan=size, sticky="nsew", padx=5, pady=(5, 10))
+        title_frame.grid(row=0, column=0, sticky="nsew", padx=5, pady=(5, 10))
         
         title = tk.Label(
             title_frame,
@@ -75,29 +122,9 @@ class GomokuGame:
         )
         title.pack(expand=True, fill='both')
         
-        # Create the GUI buttons for the game board
-        self.canvas = tk.Canvas(bg=self.colors['board_bg'])
-        for i in range(self.size):
-            for j in range(self.size):
-                button = tk.Button(
-                    self.root,
-                    text=' ',
-                    font=("Segoe UI Emoji", 24),
-                    width=2,
-                    height=1,
-                    bg=self.colors['button_bg'],
-                    fg="#2d3436",
-                    activebackground=self.colors['button_active'],
-                    relief="flat",
-                    # image=self.create_stone_image(),
-                    borderwidth=1,
-                    highlightthickness=1,
-                    highlightbackground=self.colors['button_border'],
-                    highlightcolor=self.colors['button_border'],
-                    command=lambda row=i, col=j: self.make_move(row, col)
-                )
-                button.grid(row=i + 1, column=j, padx=3, pady=3, sticky="nsew")
-                self.buttons[(i, j)] = button
+        # The game board, drawn on a single canvas
+        self.view = BoardCanvas(self.root, self.size, self.colors, self.make_move)
+        self.view.grid(row=1, column=0, padx=5, pady=5, sticky="nsew")
         
         # Status bar
         self.status_var = tk.StringVar()
@@ -113,13 +140,11 @@ class GomokuGame:
             pady=5,
             anchor='center'
         )
-        status_bar.grid(row=self.size + 1, column=0, columnspan=self.size, sticky="nsew", padx=5, pady=(10, 5))
-        
-        # Hover effects on buttons
-        self.create_hover_effect()
+        status_bar.grid(row=2, column=0, sticky="nsew", padx=5, pady=(10, 5))
         
         # Add menu
         self.create_menu()
+        self.root.protocol("WM_DELETE_WINDOW", self.exit_game)
         
         # Center the window
         self.center_window()
@@ -130,10 +155,17 @@ class GomokuGame:
 
     def create_ai(self, ai_type, depth):
         """Create an AI player based on the selected type and depth"""
+        # A solved table plays small boards perfectly; otherwise fall back
+        # to the opening book, if there is one for this size.
+        book = SolvedTable.for_size(self.board.size) or OpeningBook.for_size(self.board.size)
         if ai_type == "Minimax":
-            return MinimaxAI(depth)
+            return MinimaxAI(depth, time_limit=self.ai_time_limit, book=book)
+        elif ai_type == "MCTS":
+            return MCTSAI(depth, time_limit=self.ai_time_limit, book=book)
+        elif ai_type == "PVS":
+            return PVSAI(depth, time_limit=self.ai_time_limit, book=book)
         else:
-            return AlphaBetaAI(depth)
+            return AlphaBetaAI(depth, time_limit=self.ai_time_limit, book=book)
 
     def update_status_text(self):
         """Update the status text based on game mode and current player"""
@@ -160,8 +192,9 @@ class GomokuGame:
         # Game menu
         game_menu = tk.Menu(menubar, tearoff=0)
         game_menu.add_command(label="New Game", command=self.prompt_new_game)
+        game_menu.add_checkbutton(label="Analyze Moves", variable=self.analysis_var, command=self.toggle_analysis)
         game_menu.add_separator()
-        game_menu.add_command(label="Exit", command=self.root.quit)
+        game_menu.add_command(label="Exit", command=self.exit_game)
         menubar.add_cascade(label="Game", menu=game_menu)
         
         # Help menu
@@ -175,27 +208,79 @@ class GomokuGame:
         messagebox.showinfo(
             "About Gomoku",
             "Gomoku Game\n\nA beautiful Python implementation of the classic game\n"
-            "with AI opponents using Minimax and Alpha-Beta algorithms.\n\n"
+            "with AI opponents using Minimax, Alpha-Beta, PVS and MCTS algorithms.\n\n"
             "First to get 5 in a row wins!\n"
             "Black (⚫) vs White (🟣)"
         )
 
     def prompt_new_game(self):
         if messagebox.askyesno("New Game", "Are you sure you want to start a new game?"):
+            self.stop_search()
+            self.save_record()
             self.root.destroy()
             main()
 
-    def create_hover_effect(self):
-        for button in self.buttons.values():
-            button.bind("<Enter>", lambda e, b=button: b.config(bg=self.colors['button_hover']))
-            button.bind("<Leave>", lambda e, b=button: b.config(bg=self.colors['button_bg']))
+    def exit_game(self):
+        self.stop_search()
+        self.save_record()
+        self.root.quit()
+
+    def poll_search(self):
+        """Deliver finished background searches to the Tk loop."""
+        self.search.poll()
+        self.analysis_search.poll()
+        self.root.after(SEARCH_POLL_MS, self.poll_search)
+
+    def stop_search(self):
+        self.game_active = False
+        self.search.cancel()
+        self.ponder_move = None
+        self.waiting_for_ponder = False
+        self.analysis_search.cancel()
+
+    def toggle_analysis(self):
+        if self.analysis_var.get():
+            if self.ponder_move is not None and not self.waiting_for_ponder:
+                # Analysis takes the place of pondering.
+                self.search.cancel()
+                self.ponder_move = None
+            self.start_analysis()
+        else:
+            self.stop_analysis()
+            self.update_status_text()
+
+    def start_analysis(self):
+        """Analyze the position for the player to move, unless it is an AI."""
+        self.stop_analysis()
+        if not self.analysis_var.get() or not self.game_active or self.board.is_game_over():
+            return
+        if self.game_mode == "AI vs AI" or (self.game_mode == "Human vs AI" and self.current_player == AI):
+            return
+        # The analyzer plays the AI stones, like the engines.
+        board = self.board if self.current_player == AI else self.board.swapped()
+        self.analysis_search.start(self.analyzer, board, lambda move: None, self.show_analysis)
+
+    def show_analysis(self, depth, scores):
+        self.view.show_analysis(heat(scores))
+        self.update_status_text()
+        self.status_var.set(f"{self.status_var.get()} - analysis depth {depth}")
+
+    def stop_analysis(self):
+        self.analysis_search.cancel()
+        self.view.clear_analysis()
 
     def make_move(self, row, col):
         if not self.game_active:
             return
+
+        # Clicks are ignored while an AI is to move; its search runs in the
+        # background, so the board stays clickable.
+        if self.game_mode == "AI vs AI" or (self.game_mode == "Human vs AI" and self.current_player == AI):
+            return
             
         if self.board.is_valid_move(row, col):
             self.board.make_move(row, col, self.current_player)
+            self.record_move(row, col)
             self.update_board()
             
             # Check for winner
@@ -214,7 +299,6 @@ class GomokuGame:
             if self.current_player == AI and self.game_mode != "Human vs Human":
                 self.status_var.set("AI is thinking..." if self.game_mode == "Human vs AI" else 
                                  f"{'AI 1' if self.current_player == HUMAN else 'AI 2'} is thinking...")
-                self.root.update()
                 self.root.after(500, self.ai_move)  # Delay for realism
 
     def handle_win(self):
@@ -236,11 +320,49 @@ class GomokuGame:
             ai_player = self.ai_player_1 if self.current_player == HUMAN else self.ai_player_2
         else:
             ai_player = self.ai_player_1
-        
-        move = ai_player.get_move(self.board)
+
+        if self.ponder_move is not None:
+            last_row, last_col, _ = self.board.moves[-1]
+            if (last_row, last_col) == self.ponder_move:
+                # Ponder hit: the search already ran on this position.
+                self.ponder_move = None
+                if self.ponder_result is not None:
+                    self.apply_ai_move(self.ponder_result)
+                else:
+                    self.waiting_for_ponder = True
+                return
+            self.ponder_move = None
+            self.search.cancel()
+
+        self.search.start(ai_player, self.board, self.apply_ai_move)
+
+    def ponder_done(self, move):
+        if self.waiting_for_ponder:
+            self.waiting_for_ponder = False
+            self.apply_ai_move(move)
+        else:
+            self.ponder_result = move
+
+    def start_pondering(self):
+        """Search the human's expected reply while they are thinking."""
+        predict = getattr(self.ai_player_1, 'predict_reply', None)
+        predicted = predict(self.board) if predict else None
+        if predicted is None:
+            return
+        ponder_board = self.board.copy()
+        ponder_board.push(predicted, HUMAN)
+        self.ponder_move = predicted
+        self.ponder_result = None
+        self.search.start(self.ai_player_1, ponder_board, self.ponder_done)
+
+    def apply_ai_move(self, move):
+        if not self.game_active:
+            return
+
         if move:
             row, col = move
             self.board.make_move(row, col, self.current_player)
+            self.record_move(row, col)
             self.update_board()
 
             if self.board.check_winner(self.current_player):
@@ -258,54 +380,45 @@ class GomokuGame:
             if self.game_active and ((self.game_mode == "AI vs AI") or 
                                 (self.game_mode == "Human vs AI" and self.current_player == AI)):
                 self.root.after(500, self.ai_move)
+            elif self.game_active and self.ponder and not self.analysis_var.get():
+                self.start_pondering()
                 
+    def record_move(self, row, col):
+        now = time.time()
+        self.record.add_move(row, col, self.current_player, now - self.turn_started)
+        self.turn_started = now
+
+    def save_record(self):
+        """Append the game to GAME_RECORD_PATH, once; unfinished games are saved without a result."""
+        if self.record_saved or not self.record.moves:
+            return
+        self.record_saved = True
+        if self.board.winner is not None:
+            self.record.winner = self.board.winner
+        elif self.board.is_full():
+            self.record.winner = DRAW
+        try:
+            with GameRecordWriter(GAME_RECORD_PATH) as writer:
+                writer.write(self.record)
+        except (OSError, ValueError):
+            pass
+
     def update_board(self):
-        for i in range(self.size):
-            for j in range(self.size):
-                text = self.board.board[i][j]
-                button = self.buttons[(i, j)]
-                
-                if text == HUMAN:
-                    # Black stone (⚫)
-                    button.config(
-                        text='⚫',
-                        font=("Segoe UI Emoji", 24),
-                        fg='black',
-                        bg=self.colors['stone_bg'],
-                        disabledforeground='black'
-                    )
-                elif text == AI:
-                    # White stone (🟣)
-                    button.config(
-                        text='🟣',
-                        font=("Segoe UI Emoji", 24),
-                        fg='white',
-                        bg=self.colors['stone_bg'],
-                        disabledforeground='white'
-                    )
-                else:
-                    button.config(
-                        text=' ',
-                        font=("Segoe UI Emoji", 24),
-                        fg="#2d3436",
-                        bg=self.colors['button_bg']
-                    )
-                button.config(state='disabled' if text != EMPTY else 'normal')
+        self.view.sync(self.board)
 
     def switch_player(self):
         self.current_player = HUMAN if self.current_player == AI else AI
         self.update_status_text()
+        self.start_analysis()
 
     def end_game(self, message):
-        self.game_active = False
+        self.stop_search()
+        self.view.clear_analysis()
+        self.save_record()
         
         # Highlight winning cells if any (and if it's not a draw)
         if "draw" not in message.lower():
-            winner = HUMAN if "Black" in message or "Player 1" in message or "AI 1" in message else AI
-            winning_cells = self.board.get_winning_cells() if hasattr(self.board, 'get_winning_cells') else []
-            
-            for (i, j) in winning_cells:
-                self.buttons[(i, j)].config(bg=self.colors['win_highlight'])
+            self.view.highlight(self.board.get_winning_cells())
         
         # Show game over message
         if messagebox.askyesno("Game Over", f"{message}\n\nWould you like to play again?"):
@@ -318,9 +431,6 @@ def main():
             size = int(size_entry.get())
             if size < 5:
                 raise ValueError("Board size must be at least 5.")
-            if size > 15:
-                if not messagebox.askokcancel("Large Board", "Boards larger than 15 may not display well. Continue?"):
-                    return False
             return True
         except ValueError as e:
             messagebox.showerror("Invalid input", str(e))
@@ -333,10 +443,12 @@ def main():
         ai_type = tk.StringVar(value="AlphaBeta")
         tk.Radiobutton(frame, text="Alpha-Beta", variable=ai_type, value="AlphaBeta", bg="#f8f9fa").grid(row=0, column=1, padx=5, sticky="w")
         tk.Radiobutton(frame, text="Minimax", variable=ai_type, value="Minimax", bg="#f8f9fa").grid(row=0, column=2, padx=5, sticky="w")
+        tk.Radiobutton(frame, text="MCTS", variable=ai_type, value="MCTS", bg="#f8f9fa").grid(row=0, column=3, padx=5, sticky="w")
+        tk.Radiobutton(frame, text="PVS", variable=ai_type, value="PVS", bg="#f8f9fa").grid(row=0, column=4, padx=5, sticky="w")
         
-        tk.Label(frame, text="Depth:", bg="#f8f9fa").grid(row=0, column=3, padx=5, sticky="w")
+        tk.Label(frame, text="Depth:", bg="#f8f9fa").grid(row=0, column=5, padx=5, sticky="w")
         depth = tk.Spinbox(frame, from_=1, to=5, width=2)
-        depth.grid(row=0, column=4, padx=5, sticky="w")
+        depth.grid(row=0, column=6, padx=5, sticky="w")
         depth.delete(0, "end")
         depth.insert(0, "2")
         
@@ -439,7 +551,7 @@ def main():
     input_frame = tk.Frame(main_frame, bg="#f8f9fa")
     input_frame.pack(pady=10, fill="x")
     
-    tk.Label(input_frame, text="Board Size (5-15):", font=("Segoe UI Emoji", 12), bg="#f8f9fa").grid(row=0, column=0, sticky="w")
+    tk.Label(input_frame, text="Board Size (5+):", font=("Segoe UI Emoji", 12), bg="#f8f9fa").grid(row=0, column=0, sticky="w")
     
     size_entry = ttk.Entry(input_frame, font=("Segoe UI Emoji", 12), width=5, justify='center')
     size_entry.grid(row=0, column=1, padx=10, sticky="w")
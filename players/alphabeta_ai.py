@@ -1,60 +1,299 @@
 import math
 import time
-from board import is_full, is_win
-from utils.constants import AI, HUMAN, EMPTY
+from board import BitBoard, CANDIDATE_RADIUS, is_full
+from utils.constants import AI, HUMAN
 from utils.evaluator import utility
+from utils.move_ordering import MoveOrderer
+from utils.search_control import CHECK_INTERVAL, SearchTimeout, deadline_after, threat_deadline
+from utils.search_stats import SearchStats
+from utils.threat_space import ThreatSpaceSearch, four_points
+from utils.transposition import TranspositionTable, EXACT, LOWER, UPPER
+from utils.zobrist import SIDE_KEY
 
 
 class AlphaBetaAI:
-    def __init__(self, depth_limit=3):
+    """Iterative-deepening alpha-beta search.
+
+    depth_limit caps the iterations; with a time_limit (seconds) the search
+    stops at the deadline and plays the best move of the last completed
+    iteration.
+
+    With an opening `book` (see utils.opening_book), book positions are
+    answered without searching. Unless threat_search is False, a
+    threat-space probe runs next: a
+    forced win is played at once, and if the opponent has a victory by
+    continuous fours the root is restricted to the moves that refute it.
+    The probe gets THREAT_SHARE of the time limit and is dropped when it
+    runs out.
+
+    After every get_move() the SearchStats of that search are in `stats`.
+    Set `node_callback` to a function(board, depth, ply) to observe every
+    node, or `profile` to run the search under cProfile.
+    """
+
+    def __init__(self, depth_limit=3, tt_size_mb=16, candidate_radius=CANDIDATE_RADIUS, time_limit=None,
+                 threat_search=True, node_callback=None, profile=False, book=None):
         self.depth_limit = depth_limit
+        self.time_limit = time_limit
+        self.deadline = None
+        self.stop_requested = False
+        self.candidate_radius = candidate_radius
+        # Kept between moves: positions recur across the searches of a game.
+        self.tt = TranspositionTable(tt_size_mb)
+        self.orderer = MoveOrderer()
+        self.nodes = 0
+        self.leaf_evaluations = 0
+        self.win_checks = 0
+        self.pv_move = None
+        self.completed_depth = 0
+        self.threat_search = ThreatSpaceSearch() if threat_search else None
+        self.root_moves = None
+        self.book = book
+        self.node_callback = node_callback
+        self.profile = profile
+        self.stats = SearchStats()
 
     def get_move(self, board):
-        best_score = -math.inf
+        self.stats = SearchStats()
+        if self.profile:
+            move = self.stats.run_profiled(self.search, board)
+        else:
+            move = self.search(board)
+        self.stats.finish(move, self.nodes, self.leaf_evaluations, self.win_checks,
+                          self.orderer.cutoffs, self.orderer.cutoff_indices)
+        return move
+
+    def search(self, board):
         best_move = None
-        alpha = -math.inf
-        beta = math.inf
+        board = BitBoard.from_board(board, self.candidate_radius)
+        self.nodes = 0
+        self.leaf_evaluations = 0
+        self.win_checks = 0
+        self.orderer.new_search()
+        self.orderer.reset_counters()
+        self.pv_move = None
+        self.completed_depth = 0
+        self.deadline = deadline_after(self.time_limit)
+        self.root_moves = None
+
+        if self.book is not None and not board.is_game_over():
+            move = self.book.lookup(board)
+            if move is not None:
+                self.stats.book = True
+                return move
+
+        if self.threat_search is not None and not board.is_game_over():
+            forced = self.probe_threats(board)
+            if forced is not None:
+                self.stats.forced = True
+                return forced
 
         for depth in range(1, self.depth_limit + 1):
-            score, move = self.alphabeta(board, depth, alpha, beta, True)
+            try:
+                score, move = self.search_root(board, depth)
+            except SearchTimeout:
+                break
+            self.completed_depth = depth
+            self.record_iteration(board, depth, score, move)
             if move:
                 best_move = move
+                # Searched first by the next iteration.
+                self.pv_move = move
+        if best_move is None and not board.is_game_over():
+            # Out of time before depth 1 finished: fall back to the best
+            # ordered candidate.
+            best_move = self.orderer.order(board, self.root_moves or board.get_candidate_moves(), 0, AI, self.pv_move)[0]
         return best_move
 
-    def alphabeta(self, board, depth, alpha, beta, maximizing):
-        if is_win(board, HUMAN) or is_win(board, AI) or is_full(board) or depth == 0:
-            return utility(board), None
+    def search_root(self, board, depth):
+        """(score, move) of one iteration of the deepening loop."""
+        return self.alphabeta(board, depth, -math.inf, math.inf, True)
+
+    def record_iteration(self, board, depth, score, move):
+        self.stats.record_iteration(
+            depth, score, move, self.principal_variation(board, move, depth),
+            self.nodes, self.leaf_evaluations, self.win_checks,
+            self.orderer.cutoffs, self.orderer.cutoff_indices,
+        )
+
+    def principal_variation(self, board, move, depth):
+        """The expected line from the root: `move`, then best moves from the transposition table."""
+        pv = []
+        maximizing = True
+        while move is not None and len(pv) < depth and board.is_valid_move(*move):
+            pv.append(move)
+            board.push(move, AI if maximizing else HUMAN)
+            maximizing = not maximizing
+            if board.is_game_over():
+                break
+            key = board.hash if maximizing else board.hash ^ SIDE_KEY
+            entry = self.tt.probe(key)
+            move = entry[3] if entry is not None else None
+        for _ in pv:
+            board.pop()
+        return pv
+
+    def out_of_time(self):
+        return self.stop_requested or (self.deadline is not None and time.time() >= self.deadline)
+
+    def stop(self):
+        """Ask a running search (e.g. in another thread) to finish early."""
+        self.stop_requested = True
+
+    def clear_stop(self):
+        """Withdraw a stop() request so the next search runs in full.
+
+        Not done by get_move() itself, so that a stop() issued before a
+        search starts still stops it; the caller clears it beforehand.
+        """
+        self.stop_requested = False
 
-        valid_moves = board.get_available_moves()
+    def predict_reply(self, board):
+        """The opponent's reply this engine expects in `board`, or None.
+
+        `board` has the opponent to move, typically right after this
+        engine's move was played; the answer comes from the transposition
+        table, so it is only known after a search through that position.
+        """
+        entry = self.tt.probe(board.hash ^ SIDE_KEY)
+        if entry is not None and entry[3] is not None and board.is_valid_move(*entry[3]):
+            return entry[3]
+        return None
+
+    def probe_threats(self, board):
+        """threat_probe() bounded by THREAT_SHARE of the time limit and by stop(); None if cut short."""
+        deadline = threat_deadline(self.time_limit)
+        self.threat_search.out_of_time = lambda: (
+            self.stop_requested or (deadline is not None and time.time() >= deadline)
+        )
+        try:
+            return self.threat_probe(board)
+        except SearchTimeout:
+            return None
+
+    def threat_probe(self, board):
+        """Return a forced winning move, or None after restricting the root to defences."""
+        line = self.threat_search.find_vcf(board, AI)
+        if line:
+            return line[0]
+        threat = self.threat_search.find_vcf(board, HUMAN)
+        if threat:
+            # Refutations lie on the opponent's line or are fours of our own
+            # that take the initiative back.
+            defences = []
+            for move in sorted(set(threat) | set(four_points(board, AI))):
+                board.push(move, AI)
+                try:
+                    refuted = self.threat_search.find_vcf(board, HUMAN) is None
+                finally:
+                    board.pop()
+                if refuted:
+                    defences.append(move)
+            if defences:
+                self.root_moves = defences
+            return None
+        line = self.threat_search.find_vct(board, AI)
+        if line:
+            return line[0]
+        return None
+
+    def enter_node(self, board, depth, ply):
+        """Count a node and check the clock; its static score if it is a leaf, else None."""
+        self.nodes += 1
+        if not self.nodes & (CHECK_INTERVAL - 1) and self.out_of_time():
+            raise SearchTimeout
+        if self.node_callback is not None:
+            self.node_callback(board, depth, ply)
+        self.win_checks += 1
+        if board.winner is not None or is_full(board) or depth == 0:
+            self.leaf_evaluations += 1
+            return utility(board)
+        return None
+
+    def probe_node(self, board, depth, alpha, beta, maximizing, ply):
+        """(key, hash_move, result) of a node; result is the (score, move) the transposition table settles, or None."""
+        key = board.hash if maximizing else board.hash ^ SIDE_KEY
+        entry = self.tt.probe(key)
+        hash_move = None
+        if entry is not None:
+            hash_move = entry[3]
+            # The root always searches, so restricted root moves are honoured.
+            if entry[0] >= depth and ply > 0:
+                _, score, flag, move = entry
+                if flag == EXACT:
+                    return key, hash_move, (score, move)
+                if flag == LOWER and score >= beta:
+                    return key, hash_move, (score, move)
+                if flag == UPPER and score <= alpha:
+                    return key, hash_move, (score, move)
+        if ply == 0 and self.pv_move is not None:
+            hash_move = self.pv_move
+        return key, hash_move, None
+
+    def node_moves(self, board, ply, player, hash_move):
+        """The moves of a node in search order; the root may be restricted to root_moves."""
+        if ply == 0 and self.root_moves:
+            moves = self.root_moves
+        else:
+            moves = board.get_candidate_moves()
+        return self.orderer.order(board, moves, ply, player, hash_move)
+
+    def store_node(self, key, depth, score, move, alpha, beta):
+        """Store a node's result; alpha and beta are the window it was searched with."""
+        if score <= alpha:
+            flag = UPPER
+        elif score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(key, depth, score, flag, move)
+
+    def alphabeta(self, board, depth, alpha, beta, maximizing, ply=0):
+        leaf = self.enter_node(board, depth, ply)
+        if leaf is not None:
+            return leaf, None
+        key, hash_move, result = self.probe_node(board, depth, alpha, beta, maximizing, ply)
+        if result is not None:
+            return result
+        alpha_orig, beta_orig = alpha, beta
+
+        player = AI if maximizing else HUMAN
+        valid_moves = self.node_moves(board, ply, player, hash_move)
         best_move = None
 
         if maximizing:
             max_eval = -math.inf
-            for move in valid_moves:
-                row, col = move
-                board.board[row][col] = AI
-                eval, _ = self.alphabeta(board, depth - 1, alpha, beta, False)
-                board.board[row][col] = EMPTY
+            for index, move in enumerate(valid_moves):
+                board.push(move, AI)
+                eval, _ = self.alphabeta(board, depth - 1, alpha, beta, False, ply + 1)
+                board.pop()
 
                 if eval > max_eval:
                     max_eval = eval
                     best_move = move
                 alpha = max(alpha, eval)
                 if beta <= alpha:
+                    self.orderer.record_cutoff(move, ply, depth, AI, index)
                     break
-            return max_eval, best_move
+            best_eval = max_eval
         else:
             min_eval = math.inf
-            for move in valid_moves:
-                row, col = move
-                board.board[row][col] = HUMAN
-                eval, _ = self.alphabeta(board, depth - 1, alpha, beta, True)
-                board.board[row][col] = EMPTY
+            for index, move in enumerate(valid_moves):
+                board.push(move, HUMAN)
+                eval, _ = self.alphabeta(board, depth - 1, alpha, beta, True, ply + 1)
+                board.pop()
 
                 if eval < min_eval:
                     min_eval = eval
                     best_move = move
                 beta = min(beta, eval)
                 if beta <= alpha:
+                    self.orderer.record_cutoff(move, ply, depth, HUMAN, index)
                     break
-            return min_eval, best_move
\ No newline at end of file
+            best_eval = min_eval
+
+        self.store_node(key, depth, best_eval, best_move, alpha_orig, beta_orig)
+        return best_eval, best_move
+
+    def tt_stats(self):
+        return self.tt.stats()
@@ -0,0 +1,50 @@
+import re
+from players.alphabeta_ai import AlphaBetaAI
+from players.mcts_ai import MCTSAI
+from players.minimax_ai import MinimaxAI
+from players.parallel_alphabeta_ai import ParallelAlphaBetaAI
+from players.pvs_ai import PVSAI
+
+ENGINE_TYPES = {
+    'minimax': MinimaxAI,
+    'alphabeta': AlphaBetaAI,
+    'mcts': MCTSAI,
+    'pvs': PVSAI,
+    'parallel': ParallelAlphaBetaAI,
+}
+# Search features that can be switched off in a spec with 'no<name>'.
+ENGINE_OPTIONS = {
+    'pvs': ('pvs', 'aspiration', 'lmr'),
+}
+# Numeric settings given in a spec as <prefix><number>, e.g. 'w16'.
+ENGINE_SETTINGS = {
+    'parallel': {'w': 'workers'},
+}
+
+
+def create_engine(spec):
+    """Build an engine from a spec string 'type:depth[:seconds[:options]]', e.g. 'alphabeta:3:1.5'.
+
+    For 'mcts' the depth is the level: at most level * 1000 playouts.
+    Options are comma-separated switches: 'pvs:5:1:nolmr,noaspiration'
+    turns those features of the PVS engine off. Settings take a number:
+    'parallel:4:1.0:w16' searches with 16 worker processes.
+    """
+    parts = spec.split(':')
+    name = parts[0].lower()
+    if name not in ENGINE_TYPES:
+        raise ValueError(f"Unknown engine type {parts[0]!r}; expected one of {', '.join(ENGINE_TYPES)}")
+    depth = int(parts[1]) if len(parts) > 1 and parts[1] else 2
+    time_limit = float(parts[2]) if len(parts) > 2 and parts[2] else None
+    options = {}
+    for option in (parts[3].split(',') if len(parts) > 3 and parts[3] else []):
+        match = re.fullmatch(r'([a-z]+)(\d+)', option)
+        if match and match.group(1) in ENGINE_SETTINGS.get(name, {}):
+            options[ENGINE_SETTINGS[name][match.group(1)]] = int(match.group(2))
+            continue
+        enabled = not option.startswith('no')
+        feature = option if enabled else option[2:]
+        if feature not in ENGINE_OPTIONS.get(name, ()):
+            raise ValueError(f"Unknown option {option!r} for {name}")
+        options[feature] = enabled
+    return ENGINE_TYPES[name](depth, time_limit=time_limit, **options)
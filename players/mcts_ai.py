@@ -0,0 +1,335 @@
+import math
+import random
+import time
+from board import BitBoard
+from utils.constants import AI, HUMAN, WIN_LENGTH
+from utils.search_control import SearchTimeout, deadline_after, threat_deadline
+from utils.search_stats import SearchStats
+from utils.threat_space import ThreatSpaceSearch, five_points, opponent
+
+# Playouts per level when no playout budget is given.
+PLAYOUTS_PER_LEVEL = 1000
+BATCH_SIZE = 32
+EXPLORATION = 1.0
+# Children a node may have before widening with sqrt(visits).
+WIDENING = 2
+# Rollouts stop after this many plies and are scored by the evaluator.
+ROLLOUT_PLIES = 30
+# Evaluator score at which a cut-off rollout counts as a 73% win.
+ROLLOUT_SCALE = 1000
+# Bound on the logit of a win rate; the same bound caps rollout scores.
+MAX_LOGIT = 30.0
+# Tries at a random cell next to a random stone before falling back to
+# the full candidate list.
+NEIGHBOUR_TRIES = 8
+
+
+def win_rate_score(rate):
+    """Evaluator-scale score of an AI win rate: the inverse of the rollout logistic."""
+    if rate <= 0.0:
+        return -MAX_LOGIT * ROLLOUT_SCALE
+    if rate >= 1.0:
+        return MAX_LOGIT * ROLLOUT_SCALE
+    return max(-MAX_LOGIT, min(MAX_LOGIT, math.log(rate / (1.0 - rate)))) * ROLLOUT_SCALE
+
+
+class Node:
+    """One position in the search tree, reached by `player` playing `move`.
+
+    `wins` is counted from the point of view of `player`, so a parent
+    picks the child that is best for the side choosing it.
+    """
+
+    __slots__ = ('move', 'player', 'parent', 'children', 'untried', 'visits', 'wins')
+
+    def __init__(self, move, player, parent=None):
+        self.move = move
+        self.player = player
+        self.parent = parent
+        self.children = {}
+        self.untried = None
+        self.visits = 0
+        self.wins = 0.0
+
+
+class MCTSAI:
+    """Monte Carlo tree search with UCT selection.
+
+    The tree only grows into cells near existing stones (candidate_radius),
+    most forcing first and widening as nodes get visited, and respects
+    immediate threats: a side that can complete five does, and a side
+    facing a five blocks it. Rollouts follow the same rules and otherwise
+    play random cells next to random stones; after rollout_plies they are
+    scored from the incremental evaluator.
+
+    Rollouts run in batches of batch_size. Each leaf of a batch is
+    selected with a virtual loss on its path, so a batch spreads over
+    different lines, and the clock and stop flag are checked once per
+    batch. The search stops at the time limit or after `playouts`
+    playouts (by default level * PLAYOUTS_PER_LEVEL), whichever comes
+    first.
+
+    The tree is kept between moves: the next search starts from the
+    subtree of the move actually played, when it is in the tree.
+
+    The score in `stats` is the best move's win rate mapped back to the
+    evaluator's scale through the rollout logistic (see win_rate_score),
+    so it can be compared with the other engines' scores.
+    """
+
+    def __init__(self, level=2, time_limit=None, playouts=None, batch_size=BATCH_SIZE,
+                 exploration=EXPLORATION, candidate_radius=1, rollout_plies=ROLLOUT_PLIES,
+                 threat_search=True, book=None, profile=False, seed=None):
+        self.level = level
+        self.time_limit = time_limit
+        self.playouts = playouts
+        self.batch_size = batch_size
+        self.exploration = exploration
+        self.candidate_radius = candidate_radius
+        self.rollout_plies = rollout_plies
+        self.threat_search = ThreatSpaceSearch() if threat_search else None
+        self.book = book
+        self.profile = profile
+        self.rng = random.Random(seed)
+        self.stop_requested = False
+        self.root = None
+        self.root_moves = []
+        self.nodes = 0
+        self.leaf_evaluations = 0
+        self.reused = 0
+        self.stats = SearchStats()
+
+    def stop(self):
+        """Ask a running search (e.g. in another thread) to finish early."""
+        self.stop_requested = True
+
+    def clear_stop(self):
+        """Withdraw a stop() request before the next search (see AlphaBetaAI)."""
+        self.stop_requested = False
+
+    def get_move(self, board):
+        self.stats = SearchStats()
+        if self.profile:
+            move = self.stats.run_profiled(self.search, board)
+        else:
+            move = self.search(board)
+        self.stats.finish(move, self.nodes, self.leaf_evaluations, 0)
+        return move
+
+    def search(self, board):
+        board = BitBoard.from_board(board, self.candidate_radius)
+        self.nodes = 0
+        self.leaf_evaluations = 0
+        # The threat probe's time counts against the time limit.
+        deadline = deadline_after(self.time_limit)
+        if board.is_game_over():
+            return None
+        if self.book is not None:
+            move = self.book.lookup(board)
+            if move is not None:
+                self.stats.book = True
+                return move
+        if self.threat_search is not None:
+            line = self.probe_threats(board)
+            if line:
+                self.stats.forced = True
+                return line[0]
+
+        self.root = self.reuse_tree(board)
+        self.root_moves = list(board.moves)
+        budget = self.playouts or self.level * PLAYOUTS_PER_LEVEL
+
+        while not self.stop_requested and self.nodes < budget:
+            if deadline is not None and time.time() >= deadline:
+                break
+            self.run_batch(board, min(self.batch_size, budget - self.nodes))
+
+        if not self.root.children:
+            return board.get_candidate_moves()[0]
+        best = max(self.root.children.values(), key=lambda child: child.visits)
+        pv = self.principal_variation()
+        self.stats.record_iteration(len(pv), win_rate_score(best.wins / best.visits), best.move, pv,
+                                    self.nodes, self.leaf_evaluations, 0)
+        return best.move
+
+    def probe_threats(self, board):
+        """A winning line of continuous fours, within THREAT_SHARE of the time limit; None if cut short."""
+        deadline = threat_deadline(self.time_limit)
+        self.threat_search.out_of_time = lambda: (
+            self.stop_requested or (deadline is not None and time.time() >= deadline)
+        )
+        try:
+            return self.threat_search.find_vcf(board, AI)
+        except SearchTimeout:
+            return None
+
+    def reuse_tree(self, board):
+        """The node for `board` in the previous tree, detached as the new root, or a fresh root."""
+        self.reused = 0
+        moves = board.moves
+        known = len(self.root_moves)
+        node = self.root
+        if node is None or len(moves) != board.count or moves[:known] != self.root_moves:
+            return Node(None, HUMAN)
+        for row, col, player in moves[known:]:
+            node = node.children.get((row, col))
+            if node is None or node.player != player:
+                return Node(None, HUMAN)
+        if node.player != HUMAN:
+            return Node(None, HUMAN)
+        node.parent = None
+        self.reused = node.visits
+        return node
+
+    def principal_variation(self):
+        pv = []
+        node = self.root
+        while node.children:
+            node = max(node.children.values(), key=lambda child: child.visits)
+            pv.append(node.move)
+        return pv
+
+    def predict_reply(self, board):
+        """The opponent's most searched reply in `board` (after this engine's move), or None."""
+        if self.root is None:
+            return None
+        moves = board.moves
+        known = len(self.root_moves)
+        if moves[:known] != self.root_moves:
+            return None
+        node = self.root
+        for row, col, _ in moves[known:]:
+            node = node.children.get((row, col))
+            if node is None:
+                return None
+        if not node.children:
+            return None
+        return max(node.children.values(), key=lambda child: child.visits).move
+
+    def expansion_moves(self, board, player):
+        """Moves to add below a node with `player` to move, the most promising last."""
+        wins = five_points(board, player)
+        if wins:
+            return [wins[0]]
+        blocks = five_points(board, opponent(player))
+        if blocks:
+            return blocks
+        evaluator = board.evaluator
+        moves = board.get_candidate_moves()
+        moves.sort(key=lambda move: evaluator.threat_score(move[0], move[1], player))
+        return moves
+
+    def run_batch(self, board, batch):
+        leaves = []
+        for _ in range(batch):
+            node, pushed = self.select(board)
+            leaves.append((node, self.rollout(board, opponent(node.player))))
+            for _ in range(pushed):
+                board.pop()
+        for node, reward in leaves:
+            # Visits were counted on the way down.
+            while node is not None:
+                node.wins += reward if node.player == AI else 1.0 - reward
+                node = node.parent
+        self.nodes += batch
+
+    def select(self, board):
+        """Walk down by UCT, expanding one node; returns (leaf, moves pushed)."""
+        node = self.root
+        node.visits += 1
+        pushed = 0
+        log = math.log
+        sqrt = math.sqrt
+        c = self.exploration
+        while board.winner is None and not board.is_full():
+            player = opponent(node.player)
+            if node.untried is None:
+                node.untried = self.expansion_moves(board, player)
+            # Progressive widening: the best-ordered moves are tried first
+            # and more are added as the node gets visited.
+            if node.untried and len(node.children) < WIDENING + int(sqrt(node.visits)):
+                move = node.untried.pop()
+                child = Node(move, player, node)
+                node.children[move] = child
+                child.visits += 1
+                board.push(move, player)
+                return child, pushed + 1
+            if not node.children:
+                break
+            log_visits = log(node.visits)
+            node = max(
+                node.children.values(),
+                key=lambda child: child.wins / child.visits + c * sqrt(log_visits / child.visits),
+            )
+            node.visits += 1
+            board.push(node.move, node.player)
+            pushed += 1
+        return node, pushed
+
+    def rollout(self, board, player):
+        """Play the position out from `player` to move; returns the result for AI in [0, 1]."""
+        if board.winner is not None:
+            return 1.0 if board.winner == AI else 0.0
+        evaluator = board.evaluator
+        counts = {AI: evaluator.ai_counts, HUMAN: evaluator.human_counts}
+        windows = evaluator.windows
+        cell_windows = evaluator.cell_windows
+        threats = {
+            p: [w for w in range(len(windows)) if counts[p][w] == WIN_LENGTH - 1 and not counts[opponent(p)][w]]
+            for p in (AI, HUMAN)
+        }
+        size = board.size
+        occupied = board.occupied
+        rng = self.rng
+        plies = 0
+        while board.winner is None and plies < self.rollout_plies and not board.is_full():
+            other = opponent(player)
+            cell = self._threat_cell(threats[player], counts[player], counts[other], windows, occupied)
+            if cell is None:
+                cell = self._threat_cell(threats[other], counts[other], counts[player], windows, occupied)
+            if cell is None:
+                cell = self._random_cell(board, rng)
+            board.push(divmod(cell, size), player)
+            plies += 1
+            own, opp = counts[player], counts[other]
+            for w in cell_windows[cell]:
+                if own[w] == WIN_LENGTH - 1 and not opp[w]:
+                    threats[player].append(w)
+            player = other
+
+        if board.winner is not None:
+            result = 1.0 if board.winner == AI else 0.0
+        elif board.is_full():
+            result = 0.5
+        else:
+            self.leaf_evaluations += 1
+            x = max(-MAX_LOGIT, min(MAX_LOGIT, evaluator.score / ROLLOUT_SCALE))
+            result = 1.0 / (1.0 + math.exp(-x))
+        for _ in range(plies):
+            board.pop()
+        return result
+
+    def _threat_cell(self, threats, own, opp, windows, occupied):
+        """The open cell of a window where `own` has four and `opp` nothing, or None."""
+        for w in threats:
+            if own[w] == WIN_LENGTH - 1 and not opp[w]:
+                for cell in windows[w]:
+                    if not occupied[cell]:
+                        return cell
+        return None
+
+    def _random_cell(self, board, rng):
+        occupied = board.occupied
+        moves = board.moves
+        size = board.size
+        if moves:
+            neighbours = board.neighbours
+            for _ in range(NEIGHBOUR_TRIES):
+                row, col, _ = moves[rng.randrange(len(moves))]
+                cell = rng.choice(neighbours[row * size + col])
+                if not occupied[cell]:
+                    return cell
+        if board.candidates:
+            return rng.choice(tuple(board.candidates))
+        row, col = rng.choice(board.get_available_moves())
+        return row * size + col
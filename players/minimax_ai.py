@@ -1,49 +1,115 @@
 import math
 import time
-from board import is_full, is_win
-from utils.constants import AI, HUMAN, EMPTY
+from board import BitBoard, CANDIDATE_RADIUS, is_full
+from utils.constants import AI, HUMAN
 from utils.evaluator import utility
+from utils.search_control import CHECK_INTERVAL, SearchTimeout
+from utils.search_stats import SearchStats
 
 class MinimaxAI:
-    def __init__(self, depth_limit=2):
+    def __init__(self, depth_limit=2, candidate_radius=CANDIDATE_RADIUS, time_limit=None,
+                 node_callback=None, profile=False, book=None):
         self.depth_limit = depth_limit
+        self.candidate_radius = candidate_radius
+        self.time_limit = time_limit
+        self.nodes = 0
+        self.leaf_evaluations = 0
+        self.win_checks = 0
+        self.completed_depth = 0
+        self.stop_requested = False
+        self.book = book
+        # Same instrumentation hooks as AlphaBetaAI; results land in `stats`.
+        self.node_callback = node_callback
+        self.profile = profile
+        self.stats = SearchStats()
+        self.pv_table = {}
+        self.root_ply = 0
+
+    def stop(self):
+        """Ask a running search (e.g. in another thread) to finish early."""
+        self.stop_requested = True
+
+    def clear_stop(self):
+        """Withdraw a stop() request before the next search (see AlphaBetaAI)."""
+        self.stop_requested = False
 
     def get_move(self, board,):
-        best_score = -math.inf
+        self.stats = SearchStats()
+        if self.profile:
+            move = self.stats.run_profiled(self.search, board)
+        else:
+            move = self.search(board)
+        self.stats.finish(move, self.nodes, self.leaf_evaluations, self.win_checks)
+        return move
+
+    def search(self, board):
         best_move = None
+        board = BitBoard.from_board(board, self.candidate_radius)
+        self.nodes = 0
+        self.leaf_evaluations = 0
+        self.win_checks = 0
+        self.completed_depth = 0
+        self.root_ply = len(board.moves)
+        start_time = time.time()
+
+        if self.book is not None and not board.is_game_over():
+            move = self.book.lookup(board)
+            if move is not None:
+                self.stats.book = True
+                return move
 
         for depth in range(1, self.depth_limit + 1):
-            _, move = self.minimax(board, depth, True, time.time())  
+            try:
+                score, move = self.minimax(board, depth, True, start_time, self.time_limit)
+            except SearchTimeout:
+                # Keep the move of the last completed iteration.
+                break
+            self.completed_depth = depth
+            self.stats.record_iteration(depth, score, move, self.pv_table.get(0, []),
+                                        self.nodes, self.leaf_evaluations, self.win_checks)
             if move:
                 best_move = move
+        if best_move is None and not board.is_game_over():
+            best_move = board.get_candidate_moves()[0]
         return best_move
 
     def minimax(self, board, depth, maximizing, start_time, time_limit=3):
-        if is_win(board, HUMAN) or is_win(board, AI) or is_full(board) or depth == 0:
+        self.nodes += 1
+        if not self.nodes & (CHECK_INTERVAL - 1) and (
+                self.stop_requested or
+                (time_limit is not None and time.time() - start_time >= time_limit)):
+            raise SearchTimeout
+        ply = len(board.moves) - self.root_ply
+        if self.node_callback is not None:
+            self.node_callback(board, depth, ply)
+        self.win_checks += 1
+        if board.winner is not None or is_full(board) or depth == 0:
+            self.leaf_evaluations += 1
+            self.pv_table[ply] = []
             return utility(board), None
 
-        valid_moves = board.get_available_moves()
+        valid_moves = board.get_candidate_moves()
         best_move = None
 
         if maximizing:
             max_eval = -math.inf
             for move in valid_moves:
-                row, col = move
-                board.board[row][col] = AI  # make move
+                board.push(move, AI)  # make move
                 eval, _ = self.minimax(board, depth - 1, False, start_time, time_limit)
-                board.board[row][col] = EMPTY  # undo move
+                board.pop()  # undo move
                 if eval > max_eval:
                     max_eval = eval
                     best_move = move
+                    self.pv_table[ply] = [move] + self.pv_table.get(ply + 1, [])
             return max_eval, best_move
         else:
             min_eval = math.inf
             for move in valid_moves:
-                row, col = move
-                board.board[row][col] = HUMAN  # make move
+                board.push(move, HUMAN)  # make move
                 eval, _ = self.minimax(board, depth - 1, True, start_time, time_limit)
-                board.board[row][col] = EMPTY  # undo move
+                board.pop()  # undo move
                 if eval < min_eval:
                     min_eval = eval
                     best_move = move
+                    self.pv_table[ply] = [move] + self.pv_table.get(ply + 1, [])
             return min_eval, best_move
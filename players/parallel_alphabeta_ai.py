@@ -0,0 +1,192 @@
+import math
+import multiprocessing
+import os
+import weakref
+from board import BitBoard
+from players.alphabeta_ai import AlphaBetaAI
+from utils.constants import AI
+from utils.search_control import SearchTimeout, deadline_after
+
+# Worker-process state, set up once per process by _init_worker.
+_shared_alpha = None
+_shared_stop = None
+_worker_engine = None
+
+
+class _WorkerEngine(AlphaBetaAI):
+    """A worker's engine: it also stops when the parent's stop() sets the shared flag."""
+
+    def out_of_time(self):
+        return bool(_shared_stop.value) or super().out_of_time()
+
+
+def _init_worker(shared_alpha, shared_stop, tt_size_mb):
+    global _shared_alpha, _shared_stop, _worker_engine
+    _shared_alpha = shared_alpha
+    _shared_stop = shared_stop
+    # Each worker keeps its own engine, so its transposition table and
+    # history survive from one root move (and one game move) to the next.
+    _worker_engine = _WorkerEngine(tt_size_mb=tt_size_mb, threat_search=False)
+
+
+def _search_root_move(size, candidate_radius, moves, move, depth, deadline):
+    """Search one root move in a worker.
+
+    Returns (move, score, exact, nodes): `exact` is False when the move
+    failed low against the shared alpha, so the score is only an upper
+    bound. The score is None on timeout.
+    """
+    board = BitBoard(size, candidate_radius)
+    for row, col, player in moves:
+        board.push((row, col), player)
+    board.push(move, AI)
+
+    engine = _worker_engine
+    engine.nodes = 0
+    engine.deadline = deadline
+    # Any score at or below the best root score found so far cannot change
+    # the choice, so the search starts with that alpha.
+    alpha = _shared_alpha.value
+    try:
+        score, _ = engine.alphabeta(board, depth - 1, alpha, math.inf, False, 1)
+    except SearchTimeout:
+        return move, None, False, engine.nodes
+    # The window is (alpha, inf), so only a score above alpha is exact.
+    exact = score > alpha
+    if exact:
+        with _shared_alpha.get_lock():
+            if score > _shared_alpha.value:
+                _shared_alpha.value = score
+    return move, score, exact, engine.nodes
+
+
+class ParallelAlphaBetaAI(AlphaBetaAI):
+    """AlphaBetaAI that splits the root moves across a process pool.
+
+    At every iteration the first (best ordered) root move is searched in
+    this process to establish a bound, then the remaining root moves are
+    searched by `workers` processes. The best score found so far is kept
+    in shared memory and every worker starts its subtree with it as alpha;
+    a move that fails low against it only has an upper bound and is never
+    chosen. stop() reaches the workers through a shared flag.
+
+    Inside a daemonic process, such as a tournament.py or self_play.py
+    worker, no pool can be started and the search runs serially.
+    Call close() (or use the player as a context manager) to stop the pool.
+    Worker nodes count towards `nodes` but not towards the other counters
+    in `stats`.
+    """
+
+    def __init__(self, depth_limit=3, tt_size_mb=16, workers=None, **kwargs):
+        super().__init__(depth_limit, tt_size_mb, **kwargs)
+        self.workers = workers or os.cpu_count() or 1
+        self.tt_size_mb = tt_size_mb
+        self.pool = None
+        self.shared_alpha = None
+        self.shared_stop = None
+
+    def _ensure_pool(self):
+        if self.pool is None:
+            self.shared_alpha = multiprocessing.Value('d', -math.inf)
+            self.shared_stop = multiprocessing.Value('b', 0)
+            self.pool = multiprocessing.Pool(
+                self.workers,
+                initializer=_init_worker,
+                initargs=(self.shared_alpha, self.shared_stop, self.tt_size_mb),
+            )
+            # Engines from create_engine() are never closed by their users;
+            # the pool goes when the engine is collected or at exit.
+            self._finalizer = weakref.finalize(self, self.pool.terminate)
+        return self.pool
+
+    def stop(self):
+        super().stop()
+        if self.shared_stop is not None:
+            self.shared_stop.value = 1
+
+    def close(self):
+        if self.pool is not None:
+            self._finalizer()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def search(self, board):
+        if multiprocessing.current_process().daemon:
+            # Daemonic processes cannot have children.
+            return super().search(board)
+        board = BitBoard.from_board(board, self.candidate_radius)
+        self.nodes = 0
+        self.leaf_evaluations = 0
+        self.win_checks = 0
+        self.orderer.new_search()
+        self.orderer.reset_counters()
+        self.pv_move = None
+        self.completed_depth = 0
+        self.deadline = deadline_after(self.time_limit)
+        self.root_moves = None
+
+        if board.is_game_over():
+            return None
+        if self.book is not None:
+            move = self.book.lookup(board)
+            if move is not None:
+                self.stats.book = True
+                return move
+        if self.threat_search is not None:
+            forced = self.probe_threats(board)
+            if forced is not None:
+                self.stats.forced = True
+                return forced
+
+        root_moves = self.root_moves or board.get_candidate_moves()
+        best_move = None
+        pool = self._ensure_pool()
+        self.shared_stop.value = int(self.stop_requested)
+        for depth in range(1, self.depth_limit + 1):
+            ordered = self.orderer.order(board, root_moves, 0, AI, self.pv_move)
+            try:
+                result = self._search_depth(pool, board, ordered, depth)
+            except SearchTimeout:
+                break
+            if result is None:
+                break
+            best_move, score = result
+            self.completed_depth = depth
+            self.record_iteration(board, depth, score, best_move)
+            self.pv_move = best_move
+        if best_move is None:
+            best_move = self.orderer.order(board, root_moves, 0, AI, self.pv_move)[0]
+        return best_move
+
+    def _search_depth(self, pool, board, ordered, depth):
+        """(best move, score) of one iteration, or None if it ran out of time."""
+        first = ordered[0]
+        board.push(first, AI)
+        try:
+            best_score, _ = self.alphabeta(board, depth - 1, -math.inf, math.inf, False, 1)
+        finally:
+            board.pop()
+        best_move = first
+        if len(ordered) == 1:
+            return best_move, best_score
+
+        self.shared_alpha.value = best_score
+        tasks = [
+            (board.size, board.candidate_radius, board.moves, move, depth, self.deadline)
+            for move in ordered[1:]
+        ]
+        for move, score, exact, nodes in pool.starmap(_search_root_move, tasks):
+            self.nodes += nodes
+            if score is None:
+                # The iteration did not finish in time.
+                return None
+            if exact and score > best_score:
+                best_score = score
+                best_move = move
+        return best_move, best_score
@@ -0,0 +1,156 @@
+import math
+from players.alphabeta_ai import AlphaBetaAI
+from utils.constants import AI, HUMAN
+
+# Scores are integers, so a window this wide holds no score strictly inside.
+NULL_WINDOW = 1
+# Half-width of the first aspiration window; it grows by ASPIRATION_GROWTH
+# on every fail, and after ASPIRATION_TRIES fails that side is left open.
+# Scores swing between odd and even depths, so the window is centered on
+# the score from ASPIRATION_LAG iterations back, which ended on the same
+# side to move.
+ASPIRATION_WINDOW = 300
+ASPIRATION_GROWTH = 4
+ASPIRATION_TRIES = 3
+ASPIRATION_LAG = 2
+# utility() scores a five as +-100000; windows are not narrowed around a
+# win or loss.
+WIN_THRESHOLD = 50000
+# Late move reductions: only moves ordered after the first LMR_MOVES, at
+# depth LMR_DEPTH or more, and quiet ones: their threat score (see
+# IncrementalEvaluator.threat_score) is below QUIET_LIMIT, so they make
+# no three and block nothing bigger than a single two.
+LMR_MOVES = 3
+LMR_DEPTH = 3
+QUIET_LIMIT = 100
+
+
+class PVSAI(AlphaBetaAI):
+    """AlphaBetaAI with principal variation search, aspiration windows and
+    late move reductions, each of which can be switched off to measure it.
+
+    pvs: after the first move of a node, the other moves are searched with
+    a null window on the bound they have to beat, and searched again with
+    the full window only when they beat it.
+
+    aspiration: from depth 3 on, the root is searched with a window around
+    the score of the last iteration of the same parity, widened and
+    searched again on a fail.
+
+    lmr: late quiet moves are first searched one ply shallower, and to the
+    full depth only if that search beats the bound.
+
+    `researches`, `reductions` and `aspiration_fails` count what the last
+    search did.
+    """
+
+    def __init__(self, depth_limit=3, tt_size_mb=16, pvs=True, aspiration=True, lmr=True, **kwargs):
+        super().__init__(depth_limit, tt_size_mb, **kwargs)
+        self.pvs = pvs
+        self.aspiration = aspiration
+        self.lmr = lmr
+        self.scores = []
+        self.researches = 0
+        self.reductions = 0
+        self.aspiration_fails = 0
+
+    def search(self, board):
+        self.scores = []
+        self.researches = 0
+        self.reductions = 0
+        self.aspiration_fails = 0
+        return super().search(board)
+
+    def search_root(self, board, depth):
+        previous = self.scores[-ASPIRATION_LAG] if len(self.scores) >= ASPIRATION_LAG else None
+        if not self.aspiration or previous is None or abs(previous) >= WIN_THRESHOLD:
+            score, move = self.alphabeta(board, depth, -math.inf, math.inf, True)
+        else:
+            low = high = ASPIRATION_WINDOW
+            low_fails = high_fails = 0
+            while True:
+                alpha = previous - low if low_fails < ASPIRATION_TRIES else -math.inf
+                beta = previous + high if high_fails < ASPIRATION_TRIES else math.inf
+                score, move = self.alphabeta(board, depth, alpha, beta, True)
+                if score <= alpha:
+                    low_fails += 1
+                    low *= ASPIRATION_GROWTH
+                elif score >= beta:
+                    high_fails += 1
+                    high *= ASPIRATION_GROWTH
+                else:
+                    break
+                self.aspiration_fails += 1
+        self.scores.append(score)
+        return score, move
+
+    def alphabeta(self, board, depth, alpha, beta, maximizing, ply=0):
+        leaf = self.enter_node(board, depth, ply)
+        if leaf is not None:
+            return leaf, None
+        key, hash_move, result = self.probe_node(board, depth, alpha, beta, maximizing, ply)
+        if result is not None:
+            return result
+        alpha_orig, beta_orig = alpha, beta
+
+        player = AI if maximizing else HUMAN
+        valid_moves = self.node_moves(board, ply, player, hash_move)
+        evaluator = board.evaluator
+        best_move = None
+        best_eval = -math.inf if maximizing else math.inf
+
+        for index, move in enumerate(valid_moves):
+            reduce = (
+                self.lmr and index >= LMR_MOVES and depth >= LMR_DEPTH and move != hash_move
+                and evaluator.threat_score(move[0], move[1], player) < QUIET_LIMIT
+            )
+            board.push(move, player)
+            if index == 0:
+                eval, _ = self.alphabeta(board, depth - 1, alpha, beta, not maximizing, ply + 1)
+            else:
+                eval = self._search_late_move(board, depth, alpha, beta, maximizing, ply, reduce)
+            board.pop()
+
+            if maximizing:
+                if eval > best_eval:
+                    best_eval = eval
+                    best_move = move
+                alpha = max(alpha, eval)
+            else:
+                if eval < best_eval:
+                    best_eval = eval
+                    best_move = move
+                beta = min(beta, eval)
+            if beta <= alpha:
+                self.orderer.record_cutoff(move, ply, depth, player, index)
+                break
+
+        self.store_node(key, depth, best_eval, best_move, alpha_orig, beta_orig)
+        return best_eval, best_move
+
+    def _search_late_move(self, board, depth, alpha, beta, maximizing, ply, reduce):
+        """Score of a move after the first, already pushed, with the cheapest search that settles it."""
+        # The move matters only if it beats alpha (maximizing) or beta.
+        if not self.pvs:
+            low, high = alpha, beta
+        elif maximizing and alpha > -math.inf:
+            low, high = alpha, alpha + NULL_WINDOW
+        elif not maximizing and beta < math.inf:
+            low, high = beta - NULL_WINDOW, beta
+        else:
+            low, high = alpha, beta
+
+        def improves(eval):
+            return eval > alpha if maximizing else eval < beta
+
+        if reduce:
+            self.reductions += 1
+            eval, _ = self.alphabeta(board, depth - 2, low, high, not maximizing, ply + 1)
+            if not improves(eval):
+                return eval
+            self.researches += 1
+        eval, _ = self.alphabeta(board, depth - 1, low, high, not maximizing, ply + 1)
+        if (low, high) != (alpha, beta) and improves(eval) and alpha < eval < beta:
+            self.researches += 1
+            eval, _ = self.alphabeta(board, depth - 1, alpha, beta, not maximizing, ply + 1)
+        return eval
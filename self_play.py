@@ -0,0 +1,305 @@
+"""Self-play training data.
+
+Engines play each other in a process pool from randomized openings, and
+every position an engine searched becomes a sample: the stones, the side
+to move, the engine's search score and the final result of the game.
+Samples flow through a chain of generators (games -> samples -> unique
+-> chunks), so nothing holds more than one chunk in memory, and each
+chunk is written as its own set of .npy files that are read back
+memory-mapped:
+
+    python self_play.py alphabeta:2:0.2 --size 15 --games 5000 --output data/selfplay_15
+
+Scores and results are from the point of view of the AI (white) stones,
+like utility(): the search score of a black move is negated. Results are
+1 for a white win, -1 for a black win and 0 for a draw. Positions are
+deduplicated by Zobrist hash and side to move through a disk-backed hash
+set, so runs can be resumed and extended without repeating positions.
+
+Needs NumPy.
+"""
+import argparse
+import glob
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import time
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from board import BitBoard
+from players.factory import create_engine
+from tournament import random_opening
+from utils.constants import AI, HUMAN
+from utils.evaluator import CODES
+from utils.zobrist import SIDE_KEY
+
+CHUNK_SIZE = 65536
+# Initial slots of the hash set; it doubles when half full.
+SEEN_SLOTS = 1 << 20
+FIELDS = {
+    'positions': 'int8',
+    'side': 'int8',
+    'score': 'float32',
+    'result': 'int8',
+    'hash': 'uint64',
+}
+RESULT_VALUES = {AI: 1, HUMAN: -1, None: 0}
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("self-play data needs NumPy: pip install numpy")
+
+
+def play_game(black_spec, white_spec, size, opening):
+    """Play one game; returns (result, samples) with samples as (cells, side, score, hash)."""
+    engines = {HUMAN: create_engine(black_spec), AI: create_engine(white_spec)}
+    board = BitBoard(size)
+    player = HUMAN
+    for move in opening:
+        board.push(move, player)
+        player = AI if player == HUMAN else HUMAN
+
+    samples = []
+    while not board.is_game_over():
+        view = board if player == AI else board.swapped()
+        move = engines[player].get_move(view)
+        if move is None or not board.is_valid_move(*move):
+            break
+        score = engines[player].stats.score
+        if score is not None:
+            cells = bytearray(size * size)
+            for row, col, stone in board.stones():
+                cells[row * size + col] = CODES[stone]
+            key = board.hash ^ (SIDE_KEY if player == AI else 0)
+            samples.append((bytes(cells), CODES[player], score if player == AI else -score, key))
+        board.push(move, player)
+        player = AI if player == HUMAN else HUMAN
+    return RESULT_VALUES[board.winner], samples
+
+
+def _play(task):
+    return play_game(*task)
+
+
+def tasks(engines, size, games, opening_plies, seed):
+    """Game tasks cycling through the engine pairings, both colours each."""
+    rng = random.Random(seed)
+    pairs = [(a, b) for a in engines for b in engines if a != b] or [(engines[0], engines[0])]
+    for game in range(games):
+        black, white = pairs[game % len(pairs)]
+        yield black, white, size, random_opening(size, opening_plies, rng)
+
+
+def play_games(task_list, workers):
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap_unordered(_play, task_list)
+
+
+def samples(games):
+    for result, game_samples in games:
+        for cells, side, score, key in game_samples:
+            yield cells, side, score, result, key
+
+
+def unique(sample_stream, seen):
+    for sample in sample_stream:
+        if seen.add(sample[-1]):
+            yield sample
+
+
+def chunks(sample_stream, chunk_size):
+    chunk = []
+    for sample in sample_stream:
+        chunk.append(sample)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class HashSet:
+    """Set of 64-bit keys in a memory-mapped open-addressing table.
+
+    The table lives in a file, so tens of millions of keys cost disk
+    rather than memory, and a later run over the same directory skips
+    everything earlier runs stored. Key 0 marks an empty slot and is
+    stored as 1.
+
+    add() only stages a key in memory; commit() stores the staged keys
+    once their samples are written, so a chunk that fails to write does
+    not leave its positions marked as seen.
+    """
+
+    def __init__(self, path, slots=SEEN_SLOTS):
+        _require_numpy()
+        self.path = path
+        if os.path.exists(path):
+            self.table = np.memmap(path, dtype=np.uint64, mode='r+')
+            self.count = int(np.count_nonzero(self.table))
+        else:
+            self.table = np.memmap(path, dtype=np.uint64, mode='w+', shape=(slots,))
+            self.count = 0
+        self.mask = len(self.table) - 1
+        self.pending = set()
+
+    @staticmethod
+    def _slot(table, mask, key):
+        """Index of `key` in `table`, or of the empty slot it would go in."""
+        index = key & mask
+        while True:
+            stored = int(table[index])
+            if not stored or stored == key:
+                return index
+            index = (index + 1) & mask
+
+    def __contains__(self, key):
+        key = key or 1
+        return key in self.pending or int(self.table[self._slot(self.table, self.mask, key)]) == key
+
+    def add(self, key):
+        """Stage `key` for the next commit(); True if it was not there yet."""
+        if key in self:
+            return False
+        self.pending.add(key or 1)
+        return True
+
+    def commit(self):
+        """Store the staged keys and flush the table to disk."""
+        for key in self.pending:
+            index = self._slot(self.table, self.mask, key)
+            if not self.table[index]:
+                self.table[index] = key
+                self.count += 1
+                if 2 * self.count > len(self.table):
+                    self._grow()
+        self.pending.clear()
+        self.table.flush()
+
+    def _grow(self):
+        # The bigger table is built beside the old one and moved over it,
+        # so an interrupted grow leaves the old table intact.
+        slots = 2 * len(self.table)
+        temp_path = self.path + '.tmp'
+        table = np.memmap(temp_path, dtype=np.uint64, mode='w+', shape=(slots,))
+        for key in self.table[self.table != 0].tolist():
+            table[self._slot(table, slots - 1, key)] = key
+        table.flush()
+        del table
+        del self.table
+        os.replace(temp_path, self.path)
+        self.table = np.memmap(self.path, dtype=np.uint64, mode='r+')
+        self.mask = slots - 1
+
+
+class SelfPlayData:
+    """A directory of sample chunks; each chunk is one .npy file per field.
+
+    meta.json records the board size and the number of samples. Arrays are
+    opened memory-mapped, so reading a chunk does not load it.
+    """
+
+    def __init__(self, path, size=None):
+        _require_numpy()
+        self.path = path
+        meta_path = os.path.join(path, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+            if size is not None and size != self.meta['size']:
+                raise ValueError(f"{path} holds {self.meta['size']}x{self.meta['size']} positions, not {size}x{size}")
+        elif size is None:
+            raise ValueError(f"{path} has no self-play data")
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.meta = {'size': size, 'samples': 0, 'chunks': 0}
+        self.size = self.meta['size']
+
+    def __len__(self):
+        return self.meta['samples']
+
+    def _chunk_path(self, index, field):
+        return os.path.join(self.path, f'{field}_{index:05d}.npy')
+
+    def write_chunk(self, chunk):
+        index = self.meta['chunks']
+        count = len(chunk)
+        cells, side, score, result, key = zip(*chunk)
+        values = {
+            'positions': np.frombuffer(b''.join(cells), dtype=np.int8).reshape(count, self.size * self.size),
+            'side': side,
+            'score': score,
+            'result': result,
+            'hash': key,
+        }
+        for field, dtype in FIELDS.items():
+            shape = (count, self.size * self.size) if field == 'positions' else (count,)
+            array = np.lib.format.open_memmap(self._chunk_path(index, field), mode='w+', dtype=dtype, shape=shape)
+            array[:] = values[field]
+            array.flush()
+            del array
+        self.meta['chunks'] = index + 1
+        self.meta['samples'] += count
+        with open(os.path.join(self.path, 'meta.json'), 'w') as f:
+            json.dump(self.meta, f)
+
+    def chunk(self, index):
+        """The fields of one chunk as a dict of read-only memory-mapped arrays."""
+        return {
+            field: np.load(self._chunk_path(index, field), mmap_mode='r')
+            for field in FIELDS
+        }
+
+    def __iter__(self):
+        for index in range(self.meta['chunks']):
+            yield self.chunk(index)
+
+    def boards(self, chunk):
+        """The positions of a chunk as a (count, N, N) array of cell codes."""
+        return chunk['positions'].reshape(-1, self.size, self.size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate Gomoku training positions by self-play.")
+    parser.add_argument('engines', nargs='+', help="engine specs, type:depth[:seconds], e.g. alphabeta:2:0.2")
+    parser.add_argument('--size', type=int, default=15)
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--positions', type=int, help="stop once this many new positions are stored")
+    parser.add_argument('--opening-plies', type=int, default=4, help="random stones placed before the engines play")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="samples per chunk file")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', required=True, help="data directory; runs on an existing one add to it")
+    args = parser.parse_args(argv)
+
+    for spec in args.engines:
+        create_engine(spec)
+    data = SelfPlayData(args.output, args.size)
+    seen = HashSet(os.path.join(args.output, 'seen.u64'))
+    # A different seed per run keeps resumed runs from replaying the same openings.
+    seed = args.seed + len(glob.glob(os.path.join(args.output, 'hash_*.npy')))
+
+    stored = 0
+    start = time.time()
+    stream = unique(samples(play_games(tasks(args.engines, args.size, args.games, args.opening_plies, seed),
+                                       args.workers)), seen)
+    if args.positions is not None:
+        stream = itertools.islice(stream, args.positions)
+    for chunk in chunks(stream, args.chunk_size):
+        data.write_chunk(chunk)
+        # The chunk's keys are staged in `seen` until it is safely written.
+        seen.commit()
+        stored += len(chunk)
+        print(f"\r{stored} positions", end='', flush=True)
+    print(f"\nStored {stored} new positions in {time.time() - start:.1f}s; {len(data)} in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
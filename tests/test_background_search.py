@@ -0,0 +1,54 @@
+import time
+
+from board import GomokuBoard
+from players.alphabeta_ai import AlphaBetaAI
+from players.mcts_ai import MCTSAI
+from players.minimax_ai import MinimaxAI
+from utils.background_search import BackgroundSearch
+from utils.constants import HUMAN
+
+
+def wait_for(search, timeout=30):
+    end = time.time() + timeout
+    while search.busy() and time.time() < end:
+        search.poll()
+        time.sleep(0.01)
+
+
+def opening():
+    board = GomokuBoard(9)
+    board.make_move(4, 4, HUMAN)
+    return board
+
+
+def test_a_stale_stop_does_not_cut_the_next_search_short():
+    for engine in (AlphaBetaAI(2), MinimaxAI(1), MCTSAI(1)):
+        engine.stop()
+        engine.clear_stop()
+        assert not engine.stop_requested
+    engine = AlphaBetaAI(2, threat_search=False)
+    engine.stop()
+    search = BackgroundSearch()
+    moves = []
+    search.start(engine, opening(), moves.append)
+    wait_for(search)
+    assert moves and moves[0] is not None
+    assert engine.completed_depth == 2
+
+
+def test_a_cancel_before_the_search_starts_still_stops_it():
+    engine = AlphaBetaAI(2, threat_search=False)
+    calls = []
+    get_move = engine.get_move
+    engine.get_move = lambda board: calls.append(board) or get_move(board)
+    search = BackgroundSearch()
+    moves = []
+    with search.lock:
+        # The worker is waiting for the lock, so its search has not started.
+        search.start(engine, opening(), moves.append)
+        search.cancel()
+    search.start(engine, opening(), moves.append)
+    wait_for(search)
+    assert len(calls) == 1
+    assert moves and moves[0] is not None
+    assert engine.completed_depth == 2
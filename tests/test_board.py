@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from board import BitBoard, GomokuBoard
+from utils.constants import AI, HUMAN
+from utils.evaluator import full_utility, utility
+
+
+def rebuilt(board):
+    """The same stones written into a fresh board and rescanned from scratch."""
+    new = type(board)(board.size, board.candidate_radius)
+    for row, col, player in board.stones():
+        new._place(row, col, player)
+    new.rescan()
+    return new
+
+
+def state(board):
+    evaluator = board.evaluator
+    return (board.stones(), board.count, board.hash, board.winner, board.get_candidate_moves(),
+            evaluator.codes, evaluator.ai_counts, evaluator.human_counts)
+
+
+def assert_consistent(boards):
+    bit, grid = boards
+    assert state(bit) == state(grid)
+    for board in boards:
+        assert state(board) == state(rebuilt(board))
+        assert board.evaluator.score == pytest.approx(rebuilt(board).evaluator.score)
+        assert utility(board) == pytest.approx(full_utility(board))
+        assert bool(board.winner) == (board.scan_winner(HUMAN) or board.scan_winner(AI))
+
+
+@pytest.mark.parametrize('size', [5, 7, 9])
+def test_push_and_pop_keep_the_cached_state_consistent(size):
+    rng = random.Random(size)
+    boards = (BitBoard(size), GomokuBoard(size))
+    empty = state(boards[0])
+    for _ in range(400):
+        over = boards[0].is_game_over()
+        if boards[0].moves and (over or rng.random() < 0.35):
+            for board in boards:
+                board.pop()
+        else:
+            move = rng.choice(boards[0].get_available_moves())
+            player = AI if len(boards[0].moves) % 2 else HUMAN
+            for board in boards:
+                board.push(move, player)
+        assert_consistent(boards)
+    while boards[0].moves:
+        for board in boards:
+            board.pop()
+    assert state(boards[0]) == state(boards[1]) == empty
+    assert boards[0].evaluator.score == pytest.approx(0)
@@ -0,0 +1,48 @@
+import pytest
+
+from utils.constants import AI, HUMAN
+from utils.game_record import DRAW, MAX_SIZE, GameReader, GameRecord, GameRecordWriter
+
+
+def sample_records():
+    yield GameRecord(15, 'alphabeta:3:1', 'mcts:2', {'opening': [[7, 7]], 'seed': 3},
+                     [(7, 7, HUMAN), (7, 8, AI), (8, 8, HUMAN)], [0.0, 0.25, 1.5], HUMAN)
+    yield GameRecord(5, 'Human', 'pvs:6', moves=[(0, 0, HUMAN), (4, 4, AI)], winner=DRAW)
+    yield GameRecord(9)
+    # Cells past WHITE_BIT would collide with the colour bit.
+    yield GameRecord(MAX_SIZE, moves=[(MAX_SIZE - 1, MAX_SIZE - 1, AI)], times=[2.0], winner=AI)
+
+
+def assert_same(a, b):
+    assert (a.size, a.black, a.white, a.settings, a.moves, a.winner) == \
+           (b.size, b.black, b.white, b.settings, b.moves, b.winner)
+    assert a.times == pytest.approx(b.times)
+
+
+def test_records_round_trip_through_a_file(tmp_path):
+    path = str(tmp_path / 'games.gmr')
+    with GameRecordWriter(path) as writer:
+        for record in sample_records():
+            writer.write(record)
+    # Reopening for writing keeps what is there and appends.
+    with GameRecordWriter(path) as writer:
+        writer.write(GameRecord(7, winner=AI))
+    read = list(GameReader(path))
+    expected = list(sample_records()) + [GameRecord(7, winner=AI)]
+    assert len(read) == len(expected)
+    for a, b in zip(read, expected):
+        assert_same(a, b)
+
+
+def test_long_names_are_cut_on_a_character_boundary():
+    for name in ('é' * 200, 'a' + '棋' * 100, '🀄' * 70):
+        record = GameRecord.unpack(GameRecord(5, name, name).pack())
+        assert name.startswith(record.black) and record.black == record.white
+        assert 252 <= len(record.black.encode()) <= 255
+
+
+def test_records_too_large_to_pack_raise_value_error():
+    with pytest.raises(ValueError):
+        GameRecord(MAX_SIZE + 1).pack()
+    with pytest.raises(ValueError):
+        GameRecord(15, settings={'note': 'x' * 70000}).pack()
@@ -0,0 +1,23 @@
+import math
+
+from board import GomokuBoard
+from players.mcts_ai import MAX_LOGIT, ROLLOUT_SCALE, MCTSAI, win_rate_score
+from utils.constants import AI, HUMAN
+
+
+def test_win_rates_map_back_to_evaluator_scores():
+    for score in (-5000, -1000, 0, 250, 1000, 12000):
+        rate = 1.0 / (1.0 + math.exp(-score / ROLLOUT_SCALE))
+        assert math.isclose(win_rate_score(rate), score, abs_tol=1e-6)
+    assert win_rate_score(0.0) == -MAX_LOGIT * ROLLOUT_SCALE
+    assert win_rate_score(1.0) == MAX_LOGIT * ROLLOUT_SCALE
+
+
+def test_search_score_is_on_the_evaluator_scale():
+    board = GomokuBoard(9)
+    for row, col, player in ((4, 4, HUMAN), (3, 3, AI), (0, 8, HUMAN), (3, 4, AI), (8, 0, HUMAN), (3, 5, AI)):
+        board.make_move(row, col, player)
+    engine = MCTSAI(playouts=400, threat_search=False, seed=1)
+    engine.get_move(board)
+    # An open three against scattered stones: well above the [0, 1] win rate range.
+    assert engine.stats.score > 1
@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from self_play import HashSet
+
+
+def test_hash_set_stores_keys_only_on_commit(tmp_path):
+    path = str(tmp_path / 'seen.u64')
+    seen = HashSet(path, slots=8)
+    assert seen.add(5) and not seen.add(5)
+    assert 5 in seen
+    # Nothing committed: a new run over the directory has not seen the key.
+    assert 5 not in HashSet(path)
+    seen.commit()
+    assert 5 in HashSet(path)
+
+
+def test_hash_set_grows_in_place_of_the_old_table(tmp_path):
+    path = str(tmp_path / 'seen.u64')
+    seen = HashSet(path, slots=8)
+    keys = [0] + [key * 0x9E3779B97F4A7C15 % (1 << 64) for key in range(1, 100)]
+    for key in keys:
+        seen.add(key)
+    seen.commit()
+    assert len(seen.table) >= 2 * len(keys)
+    assert not os.path.exists(path + '.tmp')
+    reopened = HashSet(path)
+    assert reopened.count == len(keys)
+    assert all(key in reopened for key in keys)
+    assert not reopened.add(keys[-1]) and reopened.add(12345)
@@ -0,0 +1,90 @@
+import random
+
+from board import BitBoard
+from utils.constants import AI, HUMAN
+from utils.solver import DRAW, LOSS, WIN, Solver
+from utils.threat_space import opponent
+
+
+def brute_force(board, player, memo, alpha=LOSS, beta=WIN):
+    """Value for `player` to move by plain alpha-beta over every empty cell.
+
+    None of the solver's shortcuts (fours, dead cells, Erdos-Selfridge);
+    `memo` keeps (lower, upper) bounds by position.
+    """
+    if board.winner is not None:
+        return WIN if board.winner == player else LOSS
+    if board.is_full():
+        return DRAW
+    key = (board.hash, player)
+    lower, upper = memo.get(key, (LOSS, WIN))
+    if lower >= beta or lower == upper:
+        return lower
+    if upper <= alpha:
+        return upper
+    alpha, beta = max(alpha, lower), min(beta, upper)
+    best = LOSS
+    for move in board.get_available_moves():
+        board.push(move, player)
+        best = max(best, -brute_force(board, opponent(player), memo, -beta, -max(alpha, best)))
+        board.pop()
+        if best >= beta:
+            break
+    if best <= alpha:
+        upper = best
+    elif best >= beta:
+        lower = best
+    else:
+        lower = upper = best
+    memo[key] = (lower, upper)
+    return best
+
+
+def late_position(rng, size, greedy, stones):
+    """A position with at least `stones` stones, a few plies before the
+    end of a game of random play.
+
+    With probability `greedy` a move is the most threatening cell instead
+    of a random one, so games build real threats before they end.
+    """
+    while True:
+        board = BitBoard(size)
+        player = HUMAN
+        while not board.is_game_over():
+            moves = board.get_available_moves()
+            if rng.random() < greedy:
+                move = max(moves, key=lambda move: (board.evaluator.threat_score(move[0], move[1], player), rng.random()))
+            else:
+                move = rng.choice(moves)
+            board.push(move, player)
+            player = opponent(player)
+        back = rng.randint(1, 10)
+        if len(board.moves) - back >= stones:
+            for _ in range(back):
+                board.pop()
+                player = opponent(player)
+            return board, player
+
+
+def test_solver_matches_brute_force_on_5x5():
+    rng = random.Random(5)
+    memo = {}
+    values = set()
+    searched = 0
+    while searched < 60:
+        board, player = late_position(rng, 5, rng.choice([0.0, 0.3]), 13)
+        lower, upper, _, _ = Solver().analyse(board, player)
+        # Mostly positions the static rules leave open, which need a search.
+        if lower == upper and rng.random() < 0.9:
+            continue
+        searched += lower != upper
+        solver = Solver()
+        value = solver.solve(board, player)
+        assert value == brute_force(board, player, memo)
+        values.add(value)
+        view = board if player == AI else board.swapped()
+        move, _ = solver.best_move(view)
+        board.push(move, player)
+        assert -brute_force(board, opponent(player), memo) == value
+        board.pop()
+    assert values == {WIN, DRAW, LOSS}
@@ -0,0 +1,60 @@
+import random
+
+from board import BitBoard
+from utils.constants import AI, HUMAN
+from utils.solver import LOSS, Solver
+from utils.threat_space import find_vcf, find_vct
+
+
+def play(size, moves):
+    board = BitBoard(size)
+    for row, col, player in moves:
+        board.push((row, col), player)
+    return board
+
+
+def random_position(rng, size, stones):
+    """A random position with `stones` stones, black to move, or None if someone already won."""
+    board = BitBoard(size)
+    cells = rng.sample([(r, c) for r in range(size) for c in range(size)], stones)
+    for i, move in enumerate(cells):
+        board.push(move, HUMAN if i % 2 == 0 else AI)
+        if board.is_game_over():
+            return None
+    return board
+
+
+def assert_wins(board, attacker, line):
+    """The first move of `line` must win against perfect defence."""
+    defender = AI if attacker == HUMAN else HUMAN
+    board.push(line[0], attacker)
+    try:
+        assert Solver().solve(board, defender) == LOSS, (board.moves, line)
+    finally:
+        board.pop()
+
+
+def test_vct_ignores_a_three_the_defender_can_block():
+    # Reported: (3, 2) was played as a forced win, but (4, 3) and (5, 3) hold the draw.
+    board = play(6, [
+        (3, 0, AI), (2, 2, HUMAN), (3, 5, AI), (5, 5, HUMAN), (1, 4, AI), (1, 2, HUMAN),
+        (3, 3, AI), (4, 0, HUMAN), (1, 3, AI), (1, 1, HUMAN), (4, 4, AI), (2, 4, HUMAN),
+    ])
+    line = find_vct(board, AI)
+    if line is not None:
+        assert_wins(board, AI, line)
+
+
+def test_vcf_and_vct_lines_win_against_the_solver():
+    rng = random.Random(1)
+    hits = 0
+    for _ in range(300):
+        board = random_position(rng, 6, 2 * rng.randrange(5, 8))
+        if board is None:
+            continue
+        for find in (find_vcf, find_vct):
+            line = find(board, HUMAN)
+            if line:
+                hits += 1
+                assert_wins(board, HUMAN, line)
+    assert hits > 10
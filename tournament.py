@@ -0,0 +1,226 @@
+"""Headless engine matches.
+
+Plays round-robin or gauntlet matches between engine specs across a
+process pool, with randomized openings and colour swapping, and reports
+win rates and Elo differences with 95% confidence intervals.
+
+    python tournament.py alphabeta:3 minimax:2 --sizes 9 15 --games 50 --workers 8
+"""
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+
+from board import BitBoard
+from players.factory import create_engine
+from utils.constants import HUMAN, AI
+from utils.game_record import DRAW, GameRecord, GameRecordWriter
+
+Z_95 = 1.96
+
+
+def random_opening(size, plies, rng):
+    """`plies` alternating stones placed at random near the center, black first."""
+    center = size // 2
+    spread = max(1, min(2, center))
+    cells = [
+        (center + dr, center + dc)
+        for dr in range(-spread, spread + 1)
+        for dc in range(-spread, spread + 1)
+    ]
+    rng.shuffle(cells)
+    return cells[:plies]
+
+
+def play_game(black_spec, white_spec, size, opening):
+    """Play one game; black (HUMAN stones) moves first. Returns a result dict."""
+    engines = {HUMAN: create_engine(black_spec), AI: create_engine(white_spec)}
+    board = BitBoard(size)
+    player = HUMAN
+    for move in opening:
+        board.push(move, player)
+        player = AI if player == HUMAN else HUMAN
+    think_time = {HUMAN: 0.0, AI: 0.0}
+    times = [0.0] * len(opening)
+
+    while not board.is_game_over():
+        engine = engines[player]
+        # Engines search for AI, so black sees the board with colours swapped.
+        view = board if player == AI else board.swapped()
+        start = time.time()
+        move = engine.get_move(view)
+        elapsed = time.time() - start
+        think_time[player] += elapsed
+        if move is None or not board.is_valid_move(*move):
+            # An engine that cannot produce a legal move forfeits.
+            winner = AI if player == HUMAN else HUMAN
+            break
+        board.push(move, player)
+        times.append(elapsed)
+        player = AI if player == HUMAN else HUMAN
+    else:
+        winner = board.winner
+
+    return {
+        'black': black_spec,
+        'white': white_spec,
+        'size': size,
+        'opening': opening,
+        'winner': {HUMAN: black_spec, AI: white_spec}.get(winner, DRAW),
+        'plies': len(board.moves),
+        'black_time': think_time[HUMAN],
+        'white_time': think_time[AI],
+        'moves': board.moves,
+        'times': times,
+        'result': DRAW if winner is None else winner,
+    }
+
+
+def _play(task):
+    return play_game(*task)
+
+
+def schedule(engines, sizes, games, opening_plies, mode, seed):
+    """Game tasks for every pairing: each opening is played twice with colours swapped."""
+    rng = random.Random(seed)
+    if mode == 'gauntlet':
+        pairs = [(engines[0], other) for other in engines[1:]]
+    else:
+        pairs = list(itertools.combinations(engines, 2))
+    tasks = []
+    for a, b in pairs:
+        for size in sizes:
+            for _ in range((games + 1) // 2):
+                opening = random_opening(size, opening_plies, rng)
+                tasks.append((a, b, size, opening))
+                tasks.append((b, a, size, opening))
+    return tasks
+
+
+def game_record(result, opening_plies):
+    return GameRecord(
+        result['size'],
+        result['black'],
+        result['white'],
+        {'opening_plies': opening_plies},
+        result['moves'],
+        result['times'],
+        result['result'],
+    )
+
+
+def elo_interval(wins, draws, losses):
+    """Elo difference and its 95% confidence interval from a win/draw/loss record."""
+    n = wins + draws + losses
+    if not n:
+        return None, None, None
+    score = (wins + 0.5 * draws) / n
+    variance = (
+        wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2
+    ) / n
+    margin = Z_95 * math.sqrt(variance / n)
+
+    def to_elo(p):
+        p = min(max(p, 1e-6), 1 - 1e-6)
+        return -400 * math.log10(1 / p - 1)
+
+    return to_elo(score), to_elo(score - margin), to_elo(score + margin)
+
+
+def summarize(results, mode, engines):
+    if len(set(engines)) < len(engines):
+        raise ValueError("engine specs must be distinct: results are told apart by spec")
+    pairings = {}
+    for result in results:
+        for spec, opponent in ((result['black'], result['white']), (result['white'], result['black'])):
+            if mode == 'gauntlet' and spec != engines[0]:
+                continue
+            if mode != 'gauntlet' and engines.index(spec) > engines.index(opponent):
+                continue
+            record = pairings.setdefault((spec, opponent, result['size']), [0, 0, 0])
+            if result['winner'] == DRAW:
+                record[1] += 1
+            elif result['winner'] == spec:
+                record[0] += 1
+            else:
+                record[2] += 1
+
+    summary = []
+    for (spec, opponent, size), (wins, draws, losses) in sorted(pairings.items()):
+        elo, low, high = elo_interval(wins, draws, losses)
+        n = wins + draws + losses
+        summary.append({
+            'engine': spec,
+            'opponent': opponent,
+            'size': size,
+            'games': n,
+            'wins': wins,
+            'draws': draws,
+            'losses': losses,
+            'score': (wins + 0.5 * draws) / n,
+            'elo': elo,
+            'elo_low': low,
+            'elo_high': high,
+        })
+    return summary
+
+
+def print_summary(summary):
+    print(f"{'engine':<18}{'opponent':<18}{'size':>5}{'games':>7}{'W-D-L':>12}{'score':>8}  Elo (95% CI)")
+    for row in summary:
+        wdl = f"{row['wins']}-{row['draws']}-{row['losses']}"
+        print(
+            f"{row['engine']:<18}{row['opponent']:<18}{row['size']:>5}{row['games']:>7}{wdl:>12}"
+            f"{row['score']:>8.3f}  {row['elo']:+.0f} [{row['elo_low']:+.0f}, {row['elo_high']:+.0f}]"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run headless Gomoku engine matches.")
+    parser.add_argument('engines', nargs='+', help="engine specs, type:depth[:seconds], e.g. alphabeta:3:1")
+    parser.add_argument('--mode', choices=['round-robin', 'gauntlet'], default='round-robin',
+                        help="gauntlet plays the first engine against each of the others")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[9], help="board sizes")
+    parser.add_argument('--games', type=int, default=20, help="games per pairing and board size")
+    parser.add_argument('--opening-plies', type=int, default=2, help="random stones placed before the engines play")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the opening randomization")
+    parser.add_argument('--json', help="write the games and the summary to this file")
+    parser.add_argument('--record', help="append every game to this game record file")
+    args = parser.parse_args(argv)
+
+    if len(args.engines) < 2:
+        parser.error("at least two engines are needed")
+    if len(set(args.engines)) < len(args.engines):
+        # Results are keyed by spec, so a repeated spec would merge its standings.
+        parser.error("each engine spec may only be given once")
+    for spec in args.engines:
+        create_engine(spec)
+
+    tasks = schedule(args.engines, args.sizes, args.games, args.opening_plies, args.mode, args.seed)
+    results = []
+    start = time.time()
+    writer = GameRecordWriter(args.record) if args.record else None
+    with multiprocessing.Pool(args.workers) as pool:
+        for done, result in enumerate(pool.imap_unordered(_play, tasks), 1):
+            results.append(result)
+            if writer is not None:
+                writer.write(game_record(result, args.opening_plies))
+            print(f"\r{done}/{len(tasks)} games", end='', flush=True)
+    if writer is not None:
+        writer.close()
+    print(f"\nPlayed {len(results)} games in {time.time() - start:.1f}s")
+
+    summary = summarize(results, args.mode, args.engines)
+    print_summary(summary)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'games': results, 'summary': summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Whole-board move analysis: a score for every candidate move.
+
+MoveAnalyzer deepens like AlphaBetaAI, but at every depth it searches
+each root candidate to an exact score instead of only proving the best
+one, which is what the GUI's analysis overlay shows. The sibling
+searches share the engine's transposition table, killer moves and
+history, so each one starts from the hash moves and refutations the
+others found, and candidates are searched in the order of their scores
+at the previous depth, best first.
+
+Scores are from the point of view of the AI stones, like utility().
+"""
+import math
+from board import BitBoard
+from players.alphabeta_ai import AlphaBetaAI
+from players.pvs_ai import WIN_THRESHOLD
+from utils.constants import AI
+from utils.search_control import SearchTimeout, deadline_after
+
+# Score gap to the best move at which a move is shown halfway between the
+# best and the worst colour.
+HEAT_SCALE = 1000
+
+
+class MoveAnalyzer(AlphaBetaAI):
+    """Scores every candidate move, deepening until depth_limit, the time
+    limit or stop().
+
+    `on_iteration`, if set, is called with (depth, scores) after every
+    completed depth, from the searching thread; scores maps each move to
+    its score. get_move() returns the best move and leaves the scores of
+    the last completed depth in `scores`.
+    """
+
+    def __init__(self, depth_limit=8, tt_size_mb=64, time_limit=None, on_iteration=None, **kwargs):
+        super().__init__(depth_limit, tt_size_mb, time_limit=time_limit, threat_search=False, **kwargs)
+        self.on_iteration = on_iteration
+        self.scores = {}
+
+    def search(self, board):
+        board = BitBoard.from_board(board, self.candidate_radius)
+        self.nodes = 0
+        self.leaf_evaluations = 0
+        self.win_checks = 0
+        self.orderer.new_search()
+        self.orderer.reset_counters()
+        self.completed_depth = 0
+        self.deadline = deadline_after(self.time_limit)
+        self.scores = {}
+        if board.is_game_over():
+            return None
+
+        moves = board.get_candidate_moves()
+        for depth in range(1, self.depth_limit + 1):
+            try:
+                scores = self.analyse_depth(board, depth, moves)
+            except SearchTimeout:
+                break
+            self.scores = scores
+            self.completed_depth = depth
+            # Best first: the next depth searches the strongest lines first.
+            moves = sorted(scores, key=scores.get, reverse=True)
+            self.record_iteration(board, depth, scores[moves[0]], moves[0])
+            if self.on_iteration is not None:
+                self.on_iteration(depth, dict(scores))
+        return max(self.scores, key=self.scores.get) if self.scores else None
+
+    def analyse_depth(self, board, depth, moves):
+        """{move: score} of every move in `moves`, each searched to `depth` with a full window."""
+        scores = {}
+        for move in moves:
+            board.push(move, AI)
+            try:
+                scores[move] = self.alphabeta(board, depth - 1, -math.inf, math.inf, False, 1)[0]
+            finally:
+                board.pop()
+        return scores
+
+
+def score_label(score):
+    """Short text for a score: a forced win or loss, else in hundreds."""
+    if score >= WIN_THRESHOLD:
+        return 'W'
+    if score <= -WIN_THRESHOLD:
+        return 'L'
+    return f'{score / 100:+.1f}'
+
+
+def heat(scores):
+    """{move: (heat, label)} with heat 0 for the best move, tending to 1 for the worst."""
+    if not scores:
+        return {}
+    best = max(scores.values())
+    cells = {}
+    for move, score in scores.items():
+        gap = min(best - score, 2 * WIN_THRESHOLD)
+        cells[move] = (gap / (gap + HEAT_SCALE), score_label(score))
+    return cells
@@ -0,0 +1,79 @@
+import queue
+import threading
+
+
+class BackgroundSearch:
+    """Runs an engine's get_move() on a board snapshot in a worker thread.
+
+    Results are handed back through a queue; the owner calls poll()
+    periodically from its own thread (the Tk loop uses root.after) and the
+    `on_done` callback given to start() runs there with the chosen move.
+    cancel() stops the running search at its next clock check and drops
+    its result.
+
+    Neither start() nor cancel() waits for a search to end, so the owner's
+    thread never blocks: a cancelled search finishes on its own and its
+    results are discarded by job number. Searches run one at a time under
+    `lock`, so an engine is never searched from two threads at once; a new
+    search waits in its thread for a cancelled one to stop, and is skipped
+    if it was itself cancelled meanwhile.
+
+    Engines with an `on_iteration` hook (see utils.analysis.MoveAnalyzer)
+    can also report partial results: with `on_progress` given to start(),
+    it is called in the owner's thread with the hook's arguments.
+    """
+
+    def __init__(self):
+        self.results = queue.Queue()
+        self.lock = threading.Lock()
+        self.job = 0
+        self.engine = None
+        self.callback = None
+        self.progress = None
+
+    def start(self, engine, board, on_done, on_progress=None):
+        self.cancel()
+        self.job += 1
+        job = self.job
+        snapshot = board.copy()
+        self.engine = engine
+        self.callback = on_done
+        self.progress = on_progress
+
+        def run():
+            with self.lock:
+                # Cleared before the check, so a cancel() from here on
+                # still stops this search.
+                engine.clear_stop()
+                if job != self.job:
+                    return
+                if on_progress is not None:
+                    engine.on_iteration = lambda *result: self.results.put((job, False, result))
+                move = engine.get_move(snapshot)
+            self.results.put((job, True, move))
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def busy(self):
+        return self.callback is not None
+
+    def cancel(self):
+        if self.callback is not None:
+            self.job += 1
+            self.engine.stop()
+            self.callback = None
+
+    def poll(self):
+        while True:
+            try:
+                job, done, result = self.results.get_nowait()
+            except queue.Empty:
+                return
+            if job != self.job or self.callback is None:
+                continue
+            if not done:
+                self.progress(*result)
+            else:
+                callback = self.callback
+                self.callback = None
+                callback(result)
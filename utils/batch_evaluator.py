@@ -0,0 +1,198 @@
+"""utility() for many positions at once, vectorized with NumPy.
+
+Positions are stacked into an integer array of shape (batch, N, N) using
+the evaluator's cell codes. Every WIN_LENGTH window in the four
+directions is counted with shifted-slice sums and every six-cell segment
+is turned into its base-3 code the same way; the scores come from the
+same WINDOW_SCORES and SEGMENT_TABLE tables the incremental evaluator
+uses, so the results are identical to utility() on each board.
+
+pattern_features() counts the same patterns without weighting them, for
+fitting the weights (see utils.tuner): utility() of a position without
+a five is the dot product of its features with weight_vector().
+"""
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from utils.constants import WIN_LENGTH
+import utils.evaluator as evaluator
+from utils.evaluator import (
+    AI_CODE, CODES, HUMAN_CODE, SEGMENT_LENGTH, SEGMENT_PATTERNS, SEGMENT_TABLE, WINDOW_SCORES,
+    segment_pattern, window_layout,
+)
+
+WIN_SCORE = 100000
+
+# Features counted by pattern_features(): windows holding 1 to 4 stones of
+# one side only, six-cell patterns per side, and the center bias.
+STONE_COUNTS = range(1, WIN_LENGTH)
+FEATURE_NAMES = (
+    [f'ai_window_{n}' for n in STONE_COUNTS]
+    + [f'human_window_{n}' for n in STONE_COUNTS]
+    + [f'{side}_{name}' for name in SEGMENT_PATTERNS for side in ('ai', 'human')]
+    + ['center']
+)
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("the batch evaluator needs NumPy: pip install numpy")
+
+
+def boards_to_array(boards):
+    """Stack board objects of one size into a (batch, N, N) int8 array."""
+    _require_numpy()
+    size = boards[0].size
+    array = np.zeros((len(boards), size, size), dtype=np.int8)
+    for index, board in enumerate(boards):
+        for row, col, player in board.stones():
+            array[index, row, col] = CODES[player]
+    return array
+
+
+def _window_sums(stones):
+    """Stone counts of every window, per direction, for a (batch, N, N) 0/1 array."""
+    n = stones.shape[1]
+    span = n - WIN_LENGTH + 1
+    if span <= 0:
+        empty = stones[:, :0, :0].astype(np.int16)
+        return empty, empty, empty, empty
+    stones = stones.astype(np.int16)
+    vertical = sum(stones[:, i:i + span, :] for i in range(WIN_LENGTH))
+    horizontal = sum(stones[:, :, i:i + span] for i in range(WIN_LENGTH))
+    diagonal = sum(stones[:, i:i + span, i:i + span] for i in range(WIN_LENGTH))
+    anti_diagonal = sum(
+        stones[:, i:i + span, WIN_LENGTH - 1 - i:WIN_LENGTH - 1 - i + span]
+        for i in range(WIN_LENGTH)
+    )
+    return vertical, horizontal, diagonal, anti_diagonal
+
+
+def _segment_codes(positions):
+    """Base-3 codes of every six-cell segment, per direction, for a (batch, N, N) code array."""
+    n = positions.shape[1]
+    span = n - SEGMENT_LENGTH + 1
+    if span <= 0:
+        return []
+    positions = positions.astype(np.int64)
+    powers = [3 ** i for i in range(SEGMENT_LENGTH)]
+    last = SEGMENT_LENGTH - 1
+    return [
+        sum(p * positions[:, i:i + span, :] for i, p in enumerate(powers)),
+        sum(p * positions[:, :, i:i + span] for i, p in enumerate(powers)),
+        sum(p * positions[:, i:i + span, i:i + span] for i, p in enumerate(powers)),
+        sum(p * positions[:, i:i + span, last - i:last - i + span] for i, p in enumerate(powers)),
+    ]
+
+
+def batch_utility(positions):
+    """Score a (batch, N, N) array of position codes; returns an int64 array of length batch."""
+    _require_numpy()
+    positions = np.asarray(positions)
+    if positions.ndim == 2:
+        positions = positions[np.newaxis]
+    batch, size = positions.shape[0], positions.shape[1]
+    ai = positions == AI_CODE
+    human = positions == HUMAN_CODE
+
+    table = np.asarray(WINDOW_SCORES, dtype=np.int64)
+    scores = np.zeros(batch, dtype=np.int64)
+    ai_five = np.zeros(batch, dtype=bool)
+    human_five = np.zeros(batch, dtype=bool)
+    for ai_counts, human_counts in zip(_window_sums(ai), _window_sums(human)):
+        if not ai_counts.size:
+            continue
+        values = table[ai_counts * (WIN_LENGTH + 1) + human_counts]
+        scores += values.reshape(batch, -1).sum(axis=1)
+        ai_five |= (ai_counts == WIN_LENGTH).reshape(batch, -1).any(axis=1)
+        human_five |= (human_counts == WIN_LENGTH).reshape(batch, -1).any(axis=1)
+
+    segment_table = np.asarray(SEGMENT_TABLE, dtype=np.int64)
+    for codes in _segment_codes(positions):
+        scores += segment_table[codes].reshape(batch, -1).sum(axis=1)
+
+    center_bias = np.asarray(window_layout(size)[2], dtype=np.int64).reshape(size, size)
+    scores += (ai * center_bias).reshape(batch, -1).sum(axis=1)
+    scores -= (human * center_bias).reshape(batch, -1).sum(axis=1)
+
+    scores = np.where(human_five, -WIN_SCORE, scores)
+    scores = np.where(ai_five, WIN_SCORE, scores)
+    return scores
+
+
+def score_children(board, player):
+    """Score every candidate move of `player` on `board` in one batch.
+
+    Returns (moves, scores) with scores from utility()'s point of view.
+    """
+    _require_numpy()
+    moves = board.get_candidate_moves()
+    base = boards_to_array([board])[0]
+    children = np.repeat(base[np.newaxis], len(moves), axis=0)
+    rows = np.fromiter((m[0] for m in moves), dtype=np.intp, count=len(moves))
+    cols = np.fromiter((m[1] for m in moves), dtype=np.intp, count=len(moves))
+    children[np.arange(len(moves)), rows, cols] = CODES[player]
+    return moves, batch_utility(children)
+
+
+def weight_vector():
+    """The evaluator's current weights in FEATURE_NAMES order."""
+    weights = [evaluator.AI_WINDOW_WEIGHTS[n] for n in STONE_COUNTS]
+    weights += [evaluator.HUMAN_WINDOW_WEIGHTS[n] for n in STONE_COUNTS]
+    for name in SEGMENT_PATTERNS:
+        weights += list(evaluator.SEGMENT_WEIGHTS[name])
+    weights.append(evaluator.CENTER_WEIGHT)
+    return weights
+
+
+def _feature_tables():
+    """Feature index of every window (by ai_count * (WIN_LENGTH + 1) + human_count) and segment code.
+
+    Patterns that are not features map to one past the last feature.
+    """
+    none = len(FEATURE_NAMES)
+    stride = WIN_LENGTH + 1
+    windows = np.full(stride * stride, none, dtype=np.intp)
+    for n in STONE_COUNTS:
+        windows[n * stride] = FEATURE_NAMES.index(f'ai_window_{n}')
+        windows[n] = FEATURE_NAMES.index(f'human_window_{n}')
+    segments = np.full(3 ** SEGMENT_LENGTH, none, dtype=np.intp)
+    for code in range(3 ** SEGMENT_LENGTH):
+        match = segment_pattern(code)
+        if match is not None:
+            name, side = match
+            segments[code] = FEATURE_NAMES.index(f"{'ai' if side == AI_CODE else 'human'}_{name}")
+    return windows, segments
+
+
+def _count(batch, features, indices):
+    """Add, per position, how often each feature index occurs in `indices` (batch, ...)."""
+    width = len(FEATURE_NAMES) + 1
+    flat = indices.reshape(batch, -1) + (np.arange(batch) * width)[:, np.newaxis]
+    features += np.bincount(flat.ravel(), minlength=batch * width).reshape(batch, width)[:, :-1]
+
+
+def pattern_features(positions):
+    """Pattern counts of a (batch, N, N) array of position codes; an int32 array of shape (batch, features)."""
+    _require_numpy()
+    positions = np.asarray(positions)
+    if positions.ndim == 2:
+        positions = positions[np.newaxis]
+    batch, size = positions.shape[0], positions.shape[1]
+    window_features, segment_features = _feature_tables()
+    features = np.zeros((batch, len(FEATURE_NAMES)), dtype=np.int32)
+    ai = positions == AI_CODE
+    human = positions == HUMAN_CODE
+    for ai_counts, human_counts in zip(_window_sums(ai), _window_sums(human)):
+        if ai_counts.size:
+            _count(batch, features, window_features[ai_counts * (WIN_LENGTH + 1) + human_counts])
+    for codes in _segment_codes(positions):
+        _count(batch, features, segment_features[codes])
+
+    center = size // 2
+    rows, cols = np.indices((size, size))
+    bias = np.maximum(0, 5 - (abs(rows - center) + abs(cols - center)))
+    features[:, -1] = (ai * bias).reshape(batch, -1).sum(axis=1) - (human * bias).reshape(batch, -1).sum(axis=1)
+    return features
@@ -0,0 +1,194 @@
+import tkinter as tk
+from utils.constants import HUMAN
+
+# Cell size in pixels is fitted to the window, within these bounds.
+MIN_CELL = 16
+MAX_CELL = 56
+# Initial board size in pixels, before the window is resized.
+PREFERRED_SIZE = 640
+MARGIN = 12
+# Stone diameter as a fraction of the cell size.
+STONE_RATIO = 0.8
+# Analysis scores are written on cells at least this many pixels wide.
+LABEL_MIN_CELL = 24
+
+
+def blend(start, end, t):
+    """The '#rrggbb' colour a fraction t of the way from `start` to `end`."""
+    a = [int(start[i:i + 2], 16) for i in (1, 3, 5)]
+    b = [int(end[i:i + 2], 16) for i in (1, 3, 5)]
+    return '#' + ''.join(f'{round(x + (y - x) * t):02x}' for x, y in zip(a, b))
+
+
+class BoardCanvas:
+    """The game board drawn on a single tk.Canvas.
+
+    The grid is drawn once and only redrawn when the canvas is resized.
+    Clicks are mapped to cells arithmetically and passed to on_click(row,
+    col). sync() compares the board's move list with the stones already
+    drawn and only adds or deletes the ones that changed, so a move costs
+    the same on a 19x19 board as on a 5x5 one. The hover cell, the last
+    move and the winning line are single canvas items moved or recoloured
+    in place.
+
+    show_analysis() shades empty cells from the 'heat_best' to the
+    'heat_worst' colour and writes their scores on them; the shading is
+    replaced as a whole on every update and kept across redraws.
+    """
+
+    def __init__(self, master, size, colors, on_click):
+        self.size = size
+        self.colors = colors
+        self.on_click = on_click
+        self.cell = max(MIN_CELL, min(MAX_CELL, PREFERRED_SIZE // size))
+        side = self.cell * size + 2 * MARGIN
+        self.canvas = tk.Canvas(
+            master,
+            width=side,
+            height=side,
+            bg=colors['board_bg'],
+            highlightthickness=0,
+        )
+        self.drawn = []
+        self.stone_items = {}
+        self.winning_cells = []
+        self.win_items = []
+        self.hover_item = None
+        self.last_item = None
+        self.analysis = {}
+        self.redraw()
+        self.canvas.bind('<Configure>', self.on_resize)
+        self.canvas.bind('<Button-1>', self.on_press)
+        self.canvas.bind('<Motion>', self.on_motion)
+        self.canvas.bind('<Leave>', lambda event: self.canvas.itemconfigure(self.hover_item, state='hidden'))
+
+    def grid(self, **kwargs):
+        self.canvas.grid(**kwargs)
+
+    def cell_at(self, x, y):
+        """The (row, col) under canvas point (x, y), or None outside the board."""
+        row = (y - self.origin_y) // self.cell
+        col = (x - self.origin_x) // self.cell
+        if 0 <= row < self.size and 0 <= col < self.size:
+            return int(row), int(col)
+        return None
+
+    def cell_box(self, row, col, inset=0):
+        x = self.origin_x + col * self.cell
+        y = self.origin_y + row * self.cell
+        return x + inset, y + inset, x + self.cell - inset, y + self.cell - inset
+
+    def on_press(self, event):
+        cell = self.cell_at(event.x, event.y)
+        if cell is not None:
+            self.on_click(*cell)
+
+    def on_motion(self, event):
+        cell = self.cell_at(event.x, event.y)
+        if cell is None:
+            self.canvas.itemconfigure(self.hover_item, state='hidden')
+            return
+        self.canvas.coords(self.hover_item, *self.cell_box(*cell, inset=1))
+        self.canvas.itemconfigure(self.hover_item, state='normal')
+
+    def on_resize(self, event):
+        self.cell = max(MIN_CELL, min(MAX_CELL, (min(event.width, event.height) - 2 * MARGIN) // self.size))
+        self.redraw(event.width, event.height)
+
+    def redraw(self, width=None, height=None):
+        """Draw everything from scratch; only needed when the geometry changes."""
+        canvas = self.canvas
+        canvas.delete('all')
+        side = self.cell * self.size
+        if width is None:
+            width = height = side + 2 * MARGIN
+        self.origin_x = max(MARGIN, (width - side) // 2)
+        self.origin_y = max(MARGIN, (height - side) // 2)
+        x0, y0 = self.origin_x, self.origin_y
+        line = self.colors['button_border']
+        for i in range(self.size + 1):
+            offset = i * self.cell
+            canvas.create_line(x0, y0 + offset, x0 + side, y0 + offset, fill=line)
+            canvas.create_line(x0 + offset, y0, x0 + offset, y0 + side, fill=line)
+        self.hover_item = canvas.create_rectangle(
+            0, 0, 0, 0, fill=self.colors['button_hover'], outline='', state='hidden'
+        )
+        self.win_items = [
+            canvas.create_rectangle(*self.cell_box(row, col, inset=1), fill=self.colors['win_highlight'], outline='')
+            for row, col in self.winning_cells
+        ]
+        self._draw_analysis()
+        drawn = self.drawn
+        self.drawn = []
+        self.stone_items = {}
+        for row, col, player in drawn:
+            self._add_stone(row, col, player)
+        self.last_item = canvas.create_oval(0, 0, 0, 0, outline=self.colors['last_move'], width=2, state='hidden')
+        self._mark_last()
+
+    def sync(self, board):
+        """Bring the drawn stones in line with board.moves, touching only what changed."""
+        moves = board.moves
+        drawn = self.drawn
+        common = 0
+        while common < len(drawn) and common < len(moves) and drawn[common] == moves[common]:
+            common += 1
+        while len(drawn) > common:
+            row, col, _ = drawn.pop()
+            self.canvas.delete(self.stone_items.pop((row, col)))
+        for row, col, player in moves[common:]:
+            self._add_stone(row, col, player)
+        self._mark_last()
+
+    def _add_stone(self, row, col, player):
+        inset = self.cell * (1 - STONE_RATIO) / 2
+        fill = self.colors['human_stone'] if player == HUMAN else self.colors['ai_stone']
+        self.stone_items[(row, col)] = self.canvas.create_oval(
+            *self.cell_box(row, col, inset=inset), fill=fill, outline=self.colors['stone_shadow']
+        )
+        self.drawn.append((row, col, player))
+
+    def _mark_last(self):
+        if not self.drawn:
+            self.canvas.itemconfigure(self.last_item, state='hidden')
+            return
+        row, col, _ = self.drawn[-1]
+        self.canvas.coords(self.last_item, *self.cell_box(row, col, inset=self.cell * (1 - STONE_RATIO) / 2))
+        self.canvas.itemconfigure(self.last_item, state='normal')
+        self.canvas.tag_raise(self.last_item)
+
+    def highlight(self, cells):
+        """Mark `cells` (the winning line) behind their stones."""
+        for item in self.win_items:
+            self.canvas.delete(item)
+        self.winning_cells = list(cells)
+        self.win_items = []
+        for row, col in self.winning_cells:
+            item = self.canvas.create_rectangle(
+                *self.cell_box(row, col, inset=1), fill=self.colors['win_highlight'], outline=''
+            )
+            self.canvas.tag_lower(item, self.stone_items.get((row, col), self.last_item))
+            self.win_items.append(item)
+
+    def show_analysis(self, cells):
+        """Shade cells by {(row, col): (heat, label)}, heat 0 for the best move and 1 for the worst."""
+        self.analysis = dict(cells)
+        self.canvas.delete('analysis')
+        self._draw_analysis()
+
+    def clear_analysis(self):
+        self.show_analysis({})
+
+    def _draw_analysis(self):
+        canvas = self.canvas
+        font = ('Segoe UI', max(7, self.cell // 4))
+        for (row, col), (heat, label) in self.analysis.items():
+            fill = blend(self.colors['heat_best'], self.colors['heat_worst'], heat)
+            item = canvas.create_rectangle(*self.cell_box(row, col, inset=1), fill=fill, outline='', tags='analysis')
+            canvas.tag_lower(item, self.hover_item)
+            if self.cell >= LABEL_MIN_CELL:
+                x0, y0, x1, y1 = self.cell_box(row, col)
+                item = canvas.create_text(
+                    (x0 + x1) / 2, (y0 + y1) / 2, text=label, font=font, fill=self.colors['heat_text'], tags='analysis'
+                )
+                canvas.tag_lower(item, self.hover_item)
@@ -1,70 +1,355 @@
+import json
+import os
+
 from utils.constants import AI, HUMAN, EMPTY, WIN_LENGTH
-from board import is_win
+
+DIRECTIONS = [(1, 0), (0, 1), (1, 1), (1, -1)]
+
 
 def utility(board):
-  
-    if is_win(board, AI):
+
+    if board.check_winner(AI):
+        return 100000
+    elif board.check_winner(HUMAN):
+        return -100000
+
+    return board.evaluator.score
+
+def full_utility(board):
+    """Score `board` from scratch; the incremental evaluator must agree with it."""
+
+    if board.check_winner(AI):
         return 100000
-    elif is_win(board, HUMAN):
+    elif board.check_winner(HUMAN):
         return -100000
 
     score = 0
     size = len(board.board)
     b = board.board
 
-    directions = [(1, 0), (0, 1), (1, 1), (1, -1)]
-    
     for x in range(size):
         for y in range(size):
-            for dx, dy in directions:
-                line = []
-                for i in range(WIN_LENGTH):
-                    nx = x + i * dx
-                    ny = y + i * dy
-                    if 0 <= nx < size and 0 <= ny < size:
-                        line.append(b[nx][ny])
-                    else:
-                        break
-                if len(line) == WIN_LENGTH:
-                    score += evaluate_line(line, AI, HUMAN, EMPTY)
+            for dx, dy in DIRECTIONS:
+                for length, evaluate in ((WIN_LENGTH, evaluate_line), (SEGMENT_LENGTH, evaluate_segment)):
+                    line = []
+                    for i in range(length):
+                        nx = x + i * dx
+                        ny = y + i * dy
+                        if 0 <= nx < size and 0 <= ny < size:
+                            line.append(b[nx][ny])
+                        else:
+                            break
+                    if len(line) == length:
+                        score += evaluate(line, AI, HUMAN, EMPTY)
 
     # Center bias
     center = size // 2
     for i in range(size):
         for j in range(size):
             if b[i][j] == AI:
-                score += max(0, 5 - (abs(i - center) + abs(j - center)))
+                score += CENTER_WEIGHT * max(0, 5 - (abs(i - center) + abs(j - center)))
             elif b[i][j] == HUMAN:
-                score -= max(0, 5 - (abs(i - center) + abs(j - center)))
+                score -= CENTER_WEIGHT * max(0, 5 - (abs(i - center) + abs(j - center)))
 
     return score
 
+
+# Cell codes for pattern lookups: a line of cells is the base-3 number
+# sum(code * 3 ** i), read from its first cell.
+EMPTY_CODE = 0
+HUMAN_CODE = 1
+AI_CODE = 2
+CODES = {EMPTY: EMPTY_CODE, HUMAN: HUMAN_CODE, AI: AI_CODE}
+
+# Score of a WIN_LENGTH window holding stones of one side only, by how
+# many it holds; windows with both colours can never become five.
+AI_WINDOW_WEIGHTS = [0, 1, 10, 100, 1000, 5]
+HUMAN_WINDOW_WEIGHTS = [0, -1, -10, -2000, -5000, -5]
+
+# Six-cell patterns that a single window cannot tell apart from their
+# closed forms: 'x' is a stone of the side, '.' an empty cell. A four
+# with both ends open cannot be stopped, and an open three becomes one.
+SEGMENT_LENGTH = WIN_LENGTH + 1
+SEGMENT_PATTERNS = {
+    'open_four': ['.xxxx.'],
+    'open_three': ['.xxx..', '..xxx.', '.xx.x.', '.x.xx.'],
+}
+SEGMENT_WEIGHTS = {
+    'open_four': (5000, -10000),   # (AI, HUMAN)
+    'open_three': (200, -500),
+}
+# Multiplier of the per-stone center bias, max(0, 5 - distance to center).
+CENTER_WEIGHT = 1
+
+# Weights fitted by utils.tuner replace the ones above when this file
+# exists; GOMOKU_WEIGHTS points at another file.
+WEIGHTS_PATH = os.environ.get(
+    'GOMOKU_WEIGHTS',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'weights', 'evaluator.json'),
+)
+
+
+def load_weights(path):
+    """Read a weights file written by utils.tuner."""
+    with open(path) as f:
+        weights = json.load(f)
+    return (
+        weights['ai_window'],
+        weights['human_window'],
+        {name: tuple(pair) for name, pair in weights['segments'].items()},
+        weights['center'],
+    )
+
+
+if os.path.exists(WEIGHTS_PATH):
+    AI_WINDOW_WEIGHTS, HUMAN_WINDOW_WEIGHTS, SEGMENT_WEIGHTS, CENTER_WEIGHT = load_weights(WEIGHTS_PATH)
+
+
+def line_code(line, ai=AI, human=HUMAN):
+    """Base-3 code of a line of cells."""
+    code = 0
+    for cell in reversed(line):
+        code = code * 3 + (AI_CODE if cell == ai else HUMAN_CODE if cell == human else EMPTY_CODE)
+    return code
+
+
+def _digits(code, length):
+    digits = []
+    for _ in range(length):
+        code, digit = divmod(code, 3)
+        digits.append(digit)
+    return digits
+
+
+def _window_score(digits):
+    a = digits.count(AI_CODE)
+    h = digits.count(HUMAN_CODE)
+    if a and not h:
+        return AI_WINDOW_WEIGHTS[a]
+    if h and not a:
+        return HUMAN_WINDOW_WEIGHTS[h]
+    return 0
+
+
+def segment_pattern(code):
+    """(pattern name, side code) of the SEGMENT_PATTERNS entry a segment code matches, or None.
+
+    A segment matches at most one pattern.
+    """
+    digits = _digits(code, SEGMENT_LENGTH)
+    for name, patterns in SEGMENT_PATTERNS.items():
+        for side in (AI_CODE, HUMAN_CODE):
+            for pattern in patterns:
+                if all((d == side) if p == 'x' else (d == EMPTY_CODE) for p, d in zip(pattern, digits)):
+                    return name, side
+    return None
+
+
+def _segment_score(code):
+    match = segment_pattern(code)
+    if match is None:
+        return 0
+    name, side = match
+    return SEGMENT_WEIGHTS[name][0 if side == AI_CODE else 1]
+
+
+# Scores of every possible window and six-cell segment, indexed by code.
+WINDOW_TABLE = [_window_score(_digits(code, WIN_LENGTH)) for code in range(3 ** WIN_LENGTH)]
+SEGMENT_TABLE = [_segment_score(code) for code in range(3 ** SEGMENT_LENGTH)]
+
+
 def evaluate_line(line, ai, human, empty):
+    return WINDOW_TABLE[line_code(line, ai, human)]
 
-    score = 0
-    ai_count = line.count(ai)
-    human_count = line.count(human)
-    empty_count = line.count(empty)
-
-    if ai_count > 0 and human_count == 0:
-        # AI only
-        if ai_count == 4 and empty_count == 1:
-            score += 1000
-        elif ai_count == 3 and empty_count == 2:
-            score += 100
-        elif ai_count == 2 and empty_count == 3:
-            score += 10
+
+def evaluate_segment(line, ai, human, empty):
+    return SEGMENT_TABLE[line_code(line, ai, human)]
+
+
+# A window's score only depends on how many stones of each side it holds,
+# so the incremental evaluator keeps counts and reads this table, indexed
+# by ai_count * (WIN_LENGTH + 1) + human_count.
+WINDOW_SCORES = [
+    _window_score([AI_CODE] * a + [HUMAN_CODE] * h + [EMPTY_CODE] * (WIN_LENGTH - a - h))
+    if a + h <= WIN_LENGTH else 0
+    for a in range(WIN_LENGTH + 1)
+    for h in range(WIN_LENGTH + 1)
+]
+
+# Move-ordering weights indexed by the stones already in the window: a
+# stone that completes five outranks blocking the opponent's five, which
+# outranks making or blocking fours, then threes.
+THREAT_MAKE = [0, 1, 100, 10000, 1000000, 0]
+THREAT_BLOCK = [0, 1, 50, 5000, 500000, 0]
+
+_layouts = {}
+
+def window_layout(size):
+    """Return (windows, cell_windows, center_bias) for a size x size board.
+
+    windows lists the cell indices (row * size + col) of every WIN_LENGTH
+    window, cell_windows lists for each cell the windows passing through
+    it, and center_bias is the per-cell bonus used by utility(), already
+    multiplied by CENTER_WEIGHT.
+    """
+    if size not in _layouts:
+        windows = []
+        cell_windows = [[] for _ in range(size * size)]
+        for x in range(size):
+            for y in range(size):
+                for dx, dy in DIRECTIONS:
+                    ex = x + (WIN_LENGTH - 1) * dx
+                    ey = y + (WIN_LENGTH - 1) * dy
+                    if 0 <= ex < size and 0 <= ey < size:
+                        cells = [(x + i * dx) * size + (y + i * dy) for i in range(WIN_LENGTH)]
+                        for cell in cells:
+                            cell_windows[cell].append(len(windows))
+                        windows.append(cells)
+        center = size // 2
+        center_bias = [
+            CENTER_WEIGHT * max(0, 5 - (abs(i - center) + abs(j - center)))
+            for i in range(size) for j in range(size)
+        ]
+        _layouts[size] = (windows, cell_windows, center_bias)
+    return _layouts[size]
+
+
+_segment_layouts = {}
+
+def segment_layout(size):
+    """Return (segments, cell_segments) for the SEGMENT_LENGTH lines of a size x size board.
+
+    segments lists the cell indices of every six-cell segment, and
+    cell_segments lists for each cell the (segment, 3 ** position) pairs
+    of the segments passing through it.
+    """
+    if size not in _segment_layouts:
+        segments = []
+        cell_segments = [[] for _ in range(size * size)]
+        for x in range(size):
+            for y in range(size):
+                for dx, dy in DIRECTIONS:
+                    ex = x + (SEGMENT_LENGTH - 1) * dx
+                    ey = y + (SEGMENT_LENGTH - 1) * dy
+                    if 0 <= ex < size and 0 <= ey < size:
+                        cells = [(x + i * dx) * size + (y + i * dy) for i in range(SEGMENT_LENGTH)]
+                        for i, cell in enumerate(cells):
+                            cell_segments[cell].append((len(segments), 3 ** i))
+                        segments.append(cells)
+        _segment_layouts[size] = (segments, cell_segments)
+    return _segment_layouts[size]
+
+
+class IncrementalEvaluator:
+    """Running utility() score kept up to date as stones come and go.
+
+    The board calls add()/remove() from push()/pop(); only the windows
+    and six-cell segments through the changed cell are re-scored, so
+    reading `score` at a leaf costs nothing. Windows are tracked by their
+    stone counts, segments by their base-3 codes.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.windows, self.cell_windows, self.center_bias = window_layout(size)
+        self.segments, self.cell_segments = segment_layout(size)
+        self.ai_counts = [0] * len(self.windows)
+        self.human_counts = [0] * len(self.windows)
+        self.codes = [0] * len(self.segments)
+        self.score = 0
+
+    def _update_segments(self, index, digit):
+        codes = self.codes
+        delta = 0
+        for s, power in self.cell_segments[index]:
+            old = codes[s]
+            new = old + digit * power
+            codes[s] = new
+            delta += SEGMENT_TABLE[new] - SEGMENT_TABLE[old]
+        return delta
+
+    def add(self, row, col, player):
+        index = row * self.size + col
+        ai_counts = self.ai_counts
+        human_counts = self.human_counts
+        stride = WIN_LENGTH + 1
+        delta = 0
+        if player == AI:
+            for w in self.cell_windows[index]:
+                a = ai_counts[w]
+                h = human_counts[w]
+                delta += WINDOW_SCORES[(a + 1) * stride + h] - WINDOW_SCORES[a * stride + h]
+                ai_counts[w] = a + 1
+            delta += self._update_segments(index, AI_CODE)
+            self.score += delta + self.center_bias[index]
         else:
-            score += ai_count
-    elif human_count > 0 and ai_count == 0:
-        # HUMAN only
-        if human_count == 4 and empty_count == 1:
-            score -= 5000
-        elif human_count == 3 and empty_count == 2:
-            score -= 2000
-        elif human_count == 2 and empty_count == 3:
-            score -= 10
+            for w in self.cell_windows[index]:
+                a = ai_counts[w]
+                h = human_counts[w]
+                delta += WINDOW_SCORES[a * stride + h + 1] - WINDOW_SCORES[a * stride + h]
+                human_counts[w] = h + 1
+            delta += self._update_segments(index, HUMAN_CODE)
+            self.score += delta - self.center_bias[index]
+
+    def remove(self, row, col, player):
+        index = row * self.size + col
+        ai_counts = self.ai_counts
+        human_counts = self.human_counts
+        stride = WIN_LENGTH + 1
+        delta = 0
+        if player == AI:
+            for w in self.cell_windows[index]:
+                a = ai_counts[w]
+                h = human_counts[w]
+                delta += WINDOW_SCORES[(a - 1) * stride + h] - WINDOW_SCORES[a * stride + h]
+                ai_counts[w] = a - 1
+            delta += self._update_segments(index, -AI_CODE)
+            self.score += delta - self.center_bias[index]
         else:
-            score -= human_count
+            for w in self.cell_windows[index]:
+                a = ai_counts[w]
+                h = human_counts[w]
+                delta += WINDOW_SCORES[a * stride + h - 1] - WINDOW_SCORES[a * stride + h]
+                human_counts[w] = h - 1
+            delta += self._update_segments(index, -HUMAN_CODE)
+            self.score += delta + self.center_bias[index]
 
-    return score
+    def reset(self):
+        self.ai_counts = [0] * len(self.windows)
+        self.human_counts = [0] * len(self.windows)
+        self.codes = [0] * len(self.segments)
+        self.score = 0
+
+    def copy(self):
+        new = IncrementalEvaluator.__new__(IncrementalEvaluator)
+        new.size = self.size
+        new.windows = self.windows
+        new.cell_windows = self.cell_windows
+        new.center_bias = self.center_bias
+        new.segments = self.segments
+        new.cell_segments = self.cell_segments
+        new.codes = list(self.codes)
+        new.ai_counts = list(self.ai_counts)
+        new.human_counts = list(self.human_counts)
+        new.score = self.score
+        return new
+
+    def threat_score(self, row, col, player):
+        """How forcing a stone of `player` at the empty cell (row, col) would be.
+
+        Counts, over the windows through the cell, the fours and threes the
+        stone would make and the opponent fours and threes it would block.
+        """
+        if player == AI:
+            own_counts, opp_counts = self.ai_counts, self.human_counts
+        else:
+            own_counts, opp_counts = self.human_counts, self.ai_counts
+        score = 0
+        for w in self.cell_windows[row * self.size + col]:
+            own = own_counts[w]
+            opp = opp_counts[w]
+            if opp == 0:
+                score += THREAT_MAKE[own]
+            elif own == 0:
+                score += THREAT_BLOCK[opp]
+        return score
@@ -0,0 +1,292 @@
+"""Game records: a compact binary file of finished games, plus a text export.
+
+A record file starts with a short header followed by records that are
+only ever appended. Each record is a fixed header (its total length,
+board size, result, move count and string lengths) followed by the black
+and white player names, the settings as JSON, one 16-bit word per move
+(cell index, top bit set for white) and one float32 per move with the
+seconds spent choosing it. A 15x15 game of 60 moves takes about 400
+bytes, and the length prefix lets a reader skip records without decoding
+them.
+
+GameRecordWriter appends one record at a time and flushes it, so a file
+being written by the GUI or a tournament is always readable. GameReader
+memory-maps the file and decodes records lazily, so iterating over
+millions of games never holds more than one in memory:
+
+    python -m utils.game_record games/tournament.gmr --text games.txt
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+
+from board import BitBoard
+from utils.constants import AI, HUMAN
+
+MAGIC = b'GMKR'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sH')          # magic, version
+RECORD_HEADER = struct.Struct('<IBBHBBH')    # length, size, result, moves, black, white, settings
+WHITE_BIT = 0x8000
+# Largest board whose cell indices fit below WHITE_BIT.
+MAX_SIZE = 181
+
+DRAW = 'draw'
+# Result byte -> winner: None while a game is unfinished.
+RESULTS = [None, HUMAN, AI, DRAW]
+RESULT_NAMES = {None: '*', HUMAN: '1-0', AI: '0-1', DRAW: '1/2-1/2'}
+COLUMNS = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def move_name(size, row, col):
+    """'h8'-style name of a cell (column letter, row from 1), or 'row,col' on boards wider than 26."""
+    if size <= len(COLUMNS):
+        return f'{COLUMNS[col]}{row + 1}'
+    return f'{row},{col}'
+
+
+class GameRecord:
+    """One game: board size, who played, settings, and the moves with their times.
+
+    Black plays the HUMAN stones and white the AI stones. `moves` holds
+    (row, col, player) like board.moves, `times` the seconds spent on each
+    move, and `winner` is HUMAN, AI, DRAW or None for an unfinished game.
+    """
+
+    def __init__(self, size, black='', white='', settings=None, moves=None, times=None, winner=None):
+        self.size = size
+        self.black = black
+        self.white = white
+        self.settings = settings or {}
+        self.moves = list(moves or [])
+        self.times = list(times or [0.0] * len(self.moves))
+        self.winner = winner
+
+    def add_move(self, row, col, player, seconds=0.0):
+        self.moves.append((row, col, player))
+        self.times.append(seconds)
+
+    def replay(self, board_class=BitBoard):
+        """A board with every move of the game played."""
+        board = board_class(self.size)
+        for row, col, player in self.moves:
+            board.push((row, col), player)
+        return board
+
+    def key(self):
+        """Bytes identifying the size and move sequence, for finding duplicate games."""
+        return bytes([self.size]) + _pack_moves(self.size, self.moves)
+
+    def pack(self):
+        if not 0 < self.size <= MAX_SIZE:
+            raise ValueError(f"game records hold boards up to {MAX_SIZE}x{MAX_SIZE}, not {self.size}x{self.size}")
+        black = _truncate_name(self.black)
+        white = _truncate_name(self.white)
+        settings = json.dumps(self.settings, separators=(',', ':')).encode()
+        if len(settings) > 0xFFFF:
+            raise ValueError(f"game record settings take {len(settings)} bytes of JSON, more than 65535")
+        count = len(self.moves)
+        body = (
+            black + white + settings
+            + _pack_moves(self.size, self.moves)
+            + struct.pack(f'<{count}f', *self.times)
+        )
+        header = RECORD_HEADER.pack(
+            RECORD_HEADER.size + len(body), self.size, RESULTS.index(self.winner),
+            count, len(black), len(white), len(settings),
+        )
+        return header + body
+
+    @classmethod
+    def unpack(cls, buffer, offset=0):
+        length, size, result, count, black, white, settings = RECORD_HEADER.unpack_from(buffer, offset)
+        start = offset + RECORD_HEADER.size
+        names = bytes(buffer[start:start + black + white + settings])
+        start += black + white + settings
+        cells = struct.unpack_from(f'<{count}H', buffer, start)
+        times = struct.unpack_from(f'<{count}f', buffer, start + 2 * count)
+        moves = [
+            divmod(cell & ~WHITE_BIT, size) + (AI if cell & WHITE_BIT else HUMAN,)
+            for cell in cells
+        ]
+        return cls(
+            size,
+            names[:black].decode(),
+            names[black:black + white].decode(),
+            json.loads(names[black + white:]),
+            moves,
+            times,
+            RESULTS[result],
+        )
+
+    def to_text(self):
+        lines = [
+            f'[Size "{self.size}"]',
+            f'[Black "{self.black}"]',
+            f'[White "{self.white}"]',
+            f'[Result "{RESULT_NAMES[self.winner]}"]',
+        ]
+        if self.settings:
+            lines.append(f'[Settings {json.dumps(self.settings, sort_keys=True)}]')
+        lines.append('')
+        for ply, ((row, col, player), seconds) in enumerate(zip(self.moves, self.times), 1):
+            lines.append(f'{ply}. {player} {move_name(self.size, row, col)} {seconds:.2f}s')
+        lines.append(RESULT_NAMES[self.winner])
+        return '\n'.join(lines) + '\n'
+
+
+def _truncate_name(name):
+    """`name` as UTF-8, cut to the 255 bytes a record holds without splitting a character."""
+    return name.encode()[:255].decode(errors='ignore').encode()
+
+
+def _pack_moves(size, moves):
+    return struct.pack(
+        f'<{len(moves)}H',
+        *[(row * size + col) | (WHITE_BIT if player == AI else 0) for row, col, player in moves],
+    )
+
+
+class GameRecordWriter:
+    """Appends GameRecords to a record file, creating it if needed.
+
+    Every write() is flushed before it returns. A record cut short by a
+    crash is dropped when the file is next opened for writing.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path):
+            end = GameReader(path).end()
+            self.file = open(path, 'r+b')
+            self.file.truncate(end)
+            self.file.seek(end)
+        else:
+            self.file = open(path, 'wb')
+            self.file.write(FILE_HEADER.pack(MAGIC, VERSION))
+            self.file.flush()
+
+    def write(self, record):
+        self.file.write(record.pack())
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class GameReader:
+    """Lazy, memory-mapped iteration over a record file.
+
+    Iterating yields GameRecords one at a time; offsets() and keys() walk
+    the file without decoding the records, and read_at() decodes the one
+    at a given offset. A truncated last record is ignored.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _map(self):
+        with open(self.path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(data) < FILE_HEADER.size or FILE_HEADER.unpack_from(data, 0) != (MAGIC, VERSION):
+            data.close()
+            raise ValueError(f"{self.path} is not a game record file")
+        return data
+
+    def _walk(self, data):
+        offset = FILE_HEADER.size
+        end = len(data)
+        while offset + RECORD_HEADER.size <= end:
+            length = RECORD_HEADER.unpack_from(data, offset)[0]
+            if length < RECORD_HEADER.size or offset + length > end:
+                break
+            yield offset
+            offset += length
+
+    def offsets(self):
+        data = self._map()
+        try:
+            yield from self._walk(data)
+        finally:
+            data.close()
+
+    def end(self):
+        """Offset just past the last complete record."""
+        data = self._map()
+        try:
+            end = FILE_HEADER.size
+            for offset in self._walk(data):
+                end = offset + RECORD_HEADER.unpack_from(data, offset)[0]
+            return end
+        finally:
+            data.close()
+
+    def __iter__(self):
+        data = self._map()
+        try:
+            for offset in self._walk(data):
+                yield GameRecord.unpack(data, offset)
+        finally:
+            data.close()
+
+    def keys(self):
+        """GameRecord.key() of every record, read without decoding the rest."""
+        data = self._map()
+        try:
+            for offset in self._walk(data):
+                _, size, _, count, black, white, settings = RECORD_HEADER.unpack_from(data, offset)
+                start = offset + RECORD_HEADER.size + black + white + settings
+                yield bytes([size]) + data[start:start + 2 * count]
+        finally:
+            data.close()
+
+    def read_at(self, offset):
+        data = self._map()
+        try:
+            return GameRecord.unpack(data, offset)
+        finally:
+            data.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize or export a Gomoku game record file.")
+    parser.add_argument('path', help="record file")
+    parser.add_argument('--text', help="export the games as text to this file ('-' for stdout)")
+    parser.add_argument('--limit', type=int, help="only export the first LIMIT games")
+    args = parser.parse_args(argv)
+
+    reader = GameReader(args.path)
+    games = 0
+    seen = set()
+    results = dict.fromkeys(RESULT_NAMES.values(), 0)
+    out = None
+    if args.text:
+        out = open(args.text, 'w') if args.text != '-' else None
+    for record in reader:
+        games += 1
+        seen.add(record.key())
+        results[RESULT_NAMES[record.winner]] += 1
+        if args.text and (args.limit is None or games <= args.limit):
+            text = record.to_text()
+            if out is not None:
+                out.write(text + '\n')
+            else:
+                print(text)
+    if out is not None:
+        out.close()
+    print(f"{games} games, {len(seen)} distinct; " + ', '.join(f"{name}: {n}" for name, n in results.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+from utils.search_stats import CUTOFF_BUCKETS
+
+MAX_PLY = 64
+
+
+class MoveOrderer:
+    """Orders moves for alpha-beta: hash move, threats, killers, history.
+
+    The hash move (the best move from the transposition table or the
+    previous iteration) goes first, then moves that make or block fours
+    and threes, then the killer moves of the ply, then the rest by their
+    history-heuristic score.
+    """
+
+    def __init__(self, max_ply=MAX_PLY):
+        self.max_ply = max_ply
+        self.killers = [[None, None] for _ in range(max_ply)]
+        self.history = {}
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.cutoffs = 0
+        self.cutoff_indices = [0] * CUTOFF_BUCKETS
+
+    def new_search(self):
+        """Forget killers and age the history table before a new root search."""
+        self.killers = [[None, None] for _ in range(self.max_ply)]
+        self.history = {key: value >> 1 for key, value in self.history.items() if value > 1}
+
+    def order(self, board, moves, ply, player, hash_move=None):
+        evaluator = board.evaluator
+        killers = self.killers[ply] if ply < self.max_ply else (None, None)
+        history = self.history
+
+        def key(move):
+            return (
+                move == hash_move,
+                evaluator.threat_score(move[0], move[1], player),
+                move in killers,
+                history.get((player, move), 0),
+            )
+
+        return sorted(moves, key=key, reverse=True)
+
+    def record_cutoff(self, move, ply, depth, player, index):
+        """Update killers and history after `move`, tried index-th, caused a cutoff."""
+        self.cutoffs += 1
+        self.cutoff_indices[min(index, CUTOFF_BUCKETS - 1)] += 1
+        if ply < self.max_ply:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        key = (player, move)
+        self.history[key] = self.history.get(key, 0) + depth * depth
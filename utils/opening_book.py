@@ -0,0 +1,118 @@
+"""Opening book: precomputed moves for the first plies of a game.
+
+Positions are stored from the point of view of the side to move playing
+the AI stones (the engines always search for AI) and keyed by their
+Zobrist key canonicalized over the 8 board symmetries, so one entry
+covers every rotation and reflection of a position. Books are built
+offline by searching each position deeply and expanding the most
+promising replies:
+
+    python -m utils.opening_book --size 15 --plies 4 --depth 4 --output books/opening_15.gmb
+"""
+import argparse
+import os
+import time
+
+from board import BitBoard
+from players.alphabeta_ai import AlphaBetaAI
+from utils.constants import AI
+from utils.position_table import PositionTable
+from utils.symmetry import INVERSE, canonical_key, transform
+
+BOOK_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'books')
+BRANCHING = 3
+SCORE_LIMIT = 2 ** 31 - 1
+
+
+def book_path(size):
+    return os.path.join(BOOK_DIR, f'opening_{size}.gmb')
+
+
+class OpeningBook:
+    """Lazily loaded opening book for one board size."""
+
+    def __init__(self, path):
+        self.table = PositionTable(path)
+
+    @classmethod
+    def for_size(cls, size):
+        """The installed book for `size`, or None if there is none."""
+        path = book_path(size)
+        return cls(path) if os.path.exists(path) else None
+
+    def lookup(self, board):
+        """Book move for AI in `board`, or None."""
+        key, t = canonical_key(board)
+        entry = self.table.lookup(key)
+        if entry is None or entry[0] is None:
+            return None
+        move = transform(entry[0], INVERSE[t], board.size)
+        if not board.is_valid_move(*move):
+            return None
+        return move
+
+
+def best_replies(board, count):
+    """The `count` candidate moves for AI that score best one ply deep."""
+    scored = []
+    for move in board.get_candidate_moves():
+        board.push(move, AI)
+        scored.append((board.evaluator.score, move))
+        board.pop()
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [move for _, move in scored[:count]]
+
+
+def build_book(size, plies, depth=4, time_limit=None, branching=BRANCHING, log=print):
+    """Search every position reachable in `plies` plies of book play; returns {key: (move, score)}.
+
+    From each position the book move and the `branching` best one-ply
+    alternatives are expanded, covering the likely replies of either side.
+    """
+    engine = AlphaBetaAI(depth, time_limit=time_limit)
+    entries = {}
+    frontier = [BitBoard(size)]
+    for ply in range(plies):
+        next_frontier = []
+        for board in frontier:
+            if board.is_game_over():
+                continue
+            key, t = canonical_key(board)
+            if key in entries:
+                continue
+            move = engine.get_move(board)
+            if move is None:
+                continue
+            score = engine.stats.score
+            score = 0 if score is None else max(-SCORE_LIMIT, min(SCORE_LIMIT, int(score)))
+            entries[key] = (transform(move, t, size), score)
+            for reply in [move] + [m for m in best_replies(board, branching) if m != move]:
+                child = board.copy()
+                child.push(reply, AI)
+                # The other side moves next; swap so it plays AI.
+                next_frontier.append(child.swapped())
+        log(f"ply {ply + 1}: {len(entries)} positions in the book")
+        frontier = next_frontier
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a Gomoku opening book.")
+    parser.add_argument('--size', type=int, default=15)
+    parser.add_argument('--plies', type=int, default=4, help="plies of book play to cover")
+    parser.add_argument('--depth', type=int, default=4, help="search depth per book position")
+    parser.add_argument('--time-limit', type=float, help="seconds per book position")
+    parser.add_argument('--branching', type=int, default=BRANCHING, help="replies expanded per position")
+    parser.add_argument('--output', help="book file (default: the installed book for the size)")
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    entries = build_book(args.size, args.plies, args.depth, args.time_limit, args.branching)
+    output = args.output or book_path(args.size)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    PositionTable.write(output, args.size, entries)
+    print(f"Wrote {len(entries)} positions to {output} in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
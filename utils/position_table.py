@@ -0,0 +1,105 @@
+import mmap
+import os
+import struct
+
+MAGIC = b'GMKT'
+VERSION = 1
+HEADER = struct.Struct('<4sHHII')   # magic, version, board size, slots, records
+RECORD = struct.Struct('<QHiBx')    # key, move, value, flags
+NO_MOVE = 0xFFFF
+USED = 1
+
+
+class PositionTable:
+    """Read-only on-disk hash table from position keys to (move, value).
+
+    The file is a fixed header followed by fixed-size records laid out as
+    an open-addressing table (linear probing, at most half full), so a
+    lookup touches one or two records. The file is memory-mapped on the
+    first lookup; creating the object does no I/O.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._map = None
+        self.size = None
+        self.slots = 0
+        self.records = 0
+
+    def _open(self):
+        self._file = open(self.path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.size, self.slots, self.records = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a position table file")
+
+    def lookup(self, key):
+        """(move, value) stored for `key`, or None. move is (row, col) or None."""
+        if self._map is None:
+            self._open()
+        if not self.slots:
+            return None
+        index = key % self.slots
+        for _ in range(self.slots):
+            offset = HEADER.size + index * RECORD.size
+            stored_key, move, value, flags = RECORD.unpack_from(self._map, offset)
+            if not flags & USED:
+                return None
+            if stored_key == key:
+                if move == NO_MOVE:
+                    return None, value
+                return divmod(move, self.size), value
+            index = (index + 1) % self.slots
+        return None
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = None
+            self._file = None
+
+    def __len__(self):
+        if self._map is None:
+            self._open()
+        return self.records
+
+    @staticmethod
+    def write(path, size, entries):
+        """Write `entries` ({key: (move or None, value)}) for a size x size board to `path`."""
+        slots = max(1, 2 * len(entries))
+        table = [None] * slots
+        for key, (move, value) in entries.items():
+            index = key % slots
+            while table[index] is not None:
+                index = (index + 1) % slots
+            table[index] = (key, move, value)
+
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, size, slots, len(entries)))
+            empty = RECORD.pack(0, NO_MOVE, 0, 0)
+            for slot in table:
+                if slot is None:
+                    f.write(empty)
+                else:
+                    key, move, value = slot
+                    packed_move = NO_MOVE if move is None else move[0] * size + move[1]
+                    f.write(RECORD.pack(key, packed_move, value, USED))
+        os.replace(tmp, path)
+
+    @staticmethod
+    def read_all(path):
+        """Every entry of the table at `path`, as {key: (move, value)}."""
+        table = PositionTable(path)
+        entries = {}
+        try:
+            table._open()
+            for index in range(table.slots):
+                key, move, value, flags = RECORD.unpack_from(table._map, HEADER.size + index * RECORD.size)
+                if flags & USED:
+                    entries[key] = (None if move == NO_MOVE else divmod(move, table.size), value)
+        finally:
+            table.close()
+        return entries
@@ -0,0 +1,25 @@
+import time
+
+# Nodes between clock reads; a power of two so the test is a mask.
+CHECK_INTERVAL = 256
+# Share of a search's time limit the threat-space probe may use before the
+# main search starts.
+THREAT_SHARE = 0.25
+
+
+class SearchTimeout(Exception):
+    """Raised inside a search when its deadline has passed."""
+
+
+def deadline_after(time_limit):
+    """Absolute deadline for a search given `time_limit` seconds, or None."""
+    if time_limit is None:
+        return None
+    return time.time() + time_limit
+
+
+def threat_deadline(time_limit):
+    """Deadline for the threat-space probe of a search given `time_limit` seconds, or None."""
+    if time_limit is None:
+        return None
+    return deadline_after(time_limit * THREAT_SHARE)
@@ -0,0 +1,109 @@
+import cProfile
+import io
+import pstats
+import time
+
+# Cutoffs at move index CUTOFF_BUCKETS - 1 or later share the last bucket.
+CUTOFF_BUCKETS = 8
+
+
+class SearchStats:
+    """What one get_move() call did, kept on the engine as `engine.stats`.
+
+    The engines keep cumulative counters while they search and call
+    record_iteration() after every completed depth; each entry in `depths`
+    holds that iteration's own counts, its score, best move and principal
+    variation, and the time since the search started.
+    """
+
+    def __init__(self):
+        self.start_time = time.time()
+        self.elapsed = 0.0
+        self.move = None
+        self.score = None
+        self.pv = []
+        self.forced = False
+        self.book = False
+        self.depths = []
+        self.nodes = 0
+        self.leaf_evaluations = 0
+        self.win_checks = 0
+        self.cutoffs = 0
+        self.cutoff_indices = [0] * CUTOFF_BUCKETS
+        self.profile = None
+
+    def record_iteration(self, depth, score, move, pv, nodes, leaf_evaluations, win_checks,
+                         cutoffs=0, cutoff_indices=None):
+        cutoff_indices = cutoff_indices or [0] * CUTOFF_BUCKETS
+        self.depths.append({
+            'depth': depth,
+            'score': score,
+            'move': move,
+            'pv': list(pv),
+            'nodes': nodes - self.nodes,
+            'total_nodes': nodes,
+            'leaf_evaluations': leaf_evaluations - self.leaf_evaluations,
+            'win_checks': win_checks - self.win_checks,
+            'cutoffs': cutoffs - self.cutoffs,
+            'cutoff_indices': [new - old for new, old in zip(cutoff_indices, self.cutoff_indices)],
+            'time': time.time() - self.start_time,
+        })
+        self.nodes = nodes
+        self.leaf_evaluations = leaf_evaluations
+        self.win_checks = win_checks
+        self.cutoffs = cutoffs
+        self.cutoff_indices = list(cutoff_indices)
+        self.score = score
+        self.pv = list(pv)
+
+    def finish(self, move, nodes, leaf_evaluations, win_checks, cutoffs=0, cutoff_indices=None):
+        """Record the final move and the totals, including any unfinished iteration."""
+        self.move = move
+        self.nodes = nodes
+        self.leaf_evaluations = leaf_evaluations
+        self.win_checks = win_checks
+        self.cutoffs = cutoffs
+        if cutoff_indices is not None:
+            self.cutoff_indices = list(cutoff_indices)
+        self.elapsed = time.time() - self.start_time
+
+    @property
+    def completed_depth(self):
+        return self.depths[-1]['depth'] if self.depths else 0
+
+    def nodes_per_second(self):
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def run_profiled(self, func, *args):
+        """Call func(*args) under cProfile, keeping the pstats.Stats in `profile`."""
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args)
+        finally:
+            self.profile = pstats.Stats(profiler)
+
+    def profile_report(self, limit=20, sort='cumulative'):
+        if self.profile is None:
+            return ''
+        out = io.StringIO()
+        self.profile.stream = out
+        self.profile.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def as_dict(self):
+        return {
+            'move': self.move,
+            'score': self.score,
+            'pv': self.pv,
+            'forced': self.forced,
+            'book': self.book,
+            'elapsed': self.elapsed,
+            'nodes': self.nodes,
+            'nodes_per_second': self.nodes_per_second(),
+            'leaf_evaluations': self.leaf_evaluations,
+            'win_checks': self.win_checks,
+            'cutoffs': self.cutoffs,
+            'cutoff_indices': self.cutoff_indices,
+            'completed_depth': self.completed_depth,
+            'depths': self.depths,
+        }
@@ -0,0 +1,366 @@
+"""Exact solver for small boards.
+
+Solver computes the game-theoretic value (WIN, DRAW or LOSS for the side
+to move) with alpha-beta over those three values, memoized by the
+symmetry-reduced position key. Positions are cut short without searching
+when the value follows from the position itself:
+
+- a side with a four in an open window wins, and two fours to block lose;
+- a single four must be blocked, and cells in no window that either side
+  can still complete are never worth playing;
+- by the Erdos-Selfridge criterion, a side can stop its opponent from
+  ever completing a window when the opponent's live windows w satisfy
+  sum(2 ** stones(w)) < 2 ** WIN_LENGTH with that side to move, or half
+  that with the opponent to move. Blocking the cell with the largest such
+  weight keeps it true, so that move holds the draw.
+
+build_table() solves every position the AI meets in the first plies when
+it follows the solved moves against any opponent play, and writes them to
+a position table (see utils.position_table). SolvedTable reads it like an
+opening book and solves positions past the table on the spot:
+
+    python -m utils.solver --size 5 --plies 5
+    python -m utils.solver --size 5 --audit alphabeta:3
+"""
+import argparse
+import os
+import random
+import time
+
+from board import BitBoard
+from players.factory import create_engine
+from utils.constants import AI, HUMAN, EMPTY, WIN_LENGTH
+from utils.opening_book import BOOK_DIR, OpeningBook
+from utils.position_table import PositionTable
+from utils.search_control import SearchTimeout
+from utils.symmetry import INVERSE, SymmetricKeys, canonical_key, transform
+from utils.threat_space import opponent
+
+WIN = 1
+DRAW = 0
+LOSS = -1
+VALUE_NAMES = {WIN: 'win', DRAW: 'draw', LOSS: 'loss'}
+# Erdos-Selfridge threshold on sum(2 ** stones) with the defender to move.
+POTENTIAL_LIMIT = 1 << WIN_LENGTH
+# Solver nodes SolvedTable may spend on a position missing from its table.
+LOOKUP_NODES = 20000
+
+
+def solved_path(size):
+    return os.path.join(BOOK_DIR, f'solved_{size}.gmb')
+
+
+class SolvedTable(OpeningBook):
+    """Solved positions for one board size; lookup() returns a perfect move.
+
+    Positions missing from the table are handed to a Solver with a budget
+    of node_limit nodes; lookup() returns None if that is not enough.
+    """
+
+    def __init__(self, path, node_limit=LOOKUP_NODES):
+        super().__init__(path)
+        self.solver = Solver(node_limit)
+
+    @classmethod
+    def for_size(cls, size):
+        """The installed table for `size`, or None if there is none."""
+        path = solved_path(size)
+        return cls(path) if os.path.exists(path) else None
+
+    def lookup(self, board):
+        move = super().lookup(board)
+        if move is not None:
+            return move
+        result = self.solver.best_move(board)
+        return None if result is None else result[0]
+
+    def value(self, board):
+        """WIN, DRAW or LOSS for AI to move in `board`, or None if not solved."""
+        key, _ = canonical_key(board)
+        entry = self.table.lookup(key)
+        if entry is not None:
+            return entry[1]
+        return self.solver.solve(board)
+
+
+class Solver:
+    """Alpha-beta solver over WIN/DRAW/LOSS with a symmetry-reduced memo.
+
+    The memo maps canonical keys (side to move playing AI) to
+    (lower, upper, move), move being in the canonical frame and securing
+    at least `lower`. It is kept between calls, so solving related
+    positions shares the work. With a node_limit, solve() gives up and
+    returns None after that many nodes.
+    """
+
+    def __init__(self, node_limit=None):
+        self.node_limit = node_limit
+        self.nodes = 0
+        self.total_nodes = 0
+        self.memo = {}
+        self.keys = None
+
+    def solve(self, board, player=AI):
+        """Exact value of `board` for `player` to move, or None if the node budget ran out."""
+        if board.winner is not None:
+            return WIN if board.winner == player else LOSS
+        board = BitBoard.from_board(board)
+        self.keys = SymmetricKeys(board)
+        self.nodes = 0
+        try:
+            return self._search(board, player, LOSS, WIN)
+        except SearchTimeout:
+            return None
+        finally:
+            self.total_nodes += self.nodes
+
+    def best_move(self, board, player=AI):
+        """(move, value) with perfect play for `player`, or None if unsolved or the game is over."""
+        value = self.solve(board, player)
+        if value is None or board.is_game_over():
+            return None
+        key, t = canonical_key(board, swap=player != AI)
+        move = self.memo[key][2]
+        if move is None:
+            # Every cell left is dead: any move draws.
+            return board.get_available_moves()[0], value
+        return transform(move, INVERSE[t], board.size), value
+
+    def analyse(self, board, player):
+        """Bounds and candidate moves of a position where the game is not over.
+
+        Returns (lower, upper, moves, guard): lower and upper bound the
+        value for `player`, moves are the cells worth trying, most forcing
+        first, and guard is a move securing `lower` (None if any will do).
+        """
+        evaluator = board.evaluator
+        if player == AI:
+            own_counts, opp_counts = evaluator.ai_counts, evaluator.human_counts
+        else:
+            own_counts, opp_counts = evaluator.human_counts, evaluator.ai_counts
+        size = board.size
+        own_potential = 0
+        opp_potential = 0
+        blocks = set()
+        useful = set()
+        weights = {}
+        for w, cells in enumerate(evaluator.windows):
+            own = own_counts[w]
+            opp = opp_counts[w]
+            if opp == 0:
+                if own == WIN_LENGTH - 1:
+                    for cell in cells:
+                        if board.get(*divmod(cell, size)) == EMPTY:
+                            move = divmod(cell, size)
+                            return WIN, WIN, [move], move
+                own_potential += 1 << own
+                useful.update(cells)
+            if own == 0:
+                weight = 1 << opp
+                opp_potential += weight
+                for cell in cells:
+                    weights[cell] = weights.get(cell, 0) + weight
+                if opp == WIN_LENGTH - 1:
+                    blocks.update(cell for cell in cells if board.get(*divmod(cell, size)) == EMPTY)
+                useful.update(cells)
+
+        if len(blocks) > 1:
+            move = divmod(min(blocks), size)
+            return LOSS, LOSS, [move], move
+        if not useful:
+            return DRAW, DRAW, [], None
+        if blocks:
+            moves = [divmod(blocks.pop(), size)]
+        else:
+            moves = [divmod(cell, size) for cell in useful]
+            moves = [move for move in moves if board.get(*move) == EMPTY]
+            moves.sort(key=lambda move: (-evaluator.threat_score(move[0], move[1], player), move))
+
+        lower, guard = LOSS, None
+        if opp_potential < POTENTIAL_LIMIT:
+            lower = DRAW
+            if opp_potential:
+                guard = max(moves, key=lambda move: weights.get(move[0] * size + move[1], 0))
+        upper = DRAW if own_potential < POTENTIAL_LIMIT // 2 else WIN
+        return lower, upper, moves, guard
+
+    def _search(self, board, player, alpha, beta):
+        self.nodes += 1
+        if self.node_limit is not None and self.nodes > self.node_limit:
+            raise SearchTimeout
+        key, t = self.keys.canonical(swap=player != AI)
+        entry = self.memo.get(key)
+        if entry is not None:
+            lower, upper, move = entry
+            if lower == upper or lower >= beta:
+                return lower
+            if upper <= alpha:
+                return upper
+
+        size = board.size
+        if board.is_full():
+            self.memo[key] = (DRAW, DRAW, None)
+            return DRAW
+        static_lower, static_upper, moves, guard = self.analyse(board, player)
+        if entry is None or static_lower > lower:
+            lower = static_lower
+            move = None if guard is None else transform(guard, t, size)
+        upper = static_upper if entry is None else min(upper, static_upper)
+        if lower >= upper or lower >= beta or upper <= alpha:
+            self.memo[key] = (lower, upper, move)
+            return lower if lower >= upper or lower >= beta else upper
+
+        if move is not None:
+            hash_move = transform(move, INVERSE[t], size)
+            if hash_move in moves:
+                moves.remove(hash_move)
+                moves.insert(0, hash_move)
+
+        low = max(alpha, lower)
+        high = min(beta, upper)
+        other = opponent(player)
+        a = low
+        best = None
+        best_move = None
+        for candidate in moves:
+            board.push(candidate, player)
+            self.keys.toggle(candidate[0], candidate[1], player)
+            try:
+                score = -self._search(board, other, -high, -a)
+            finally:
+                board.pop()
+                self.keys.toggle(candidate[0], candidate[1], player)
+            if best is None or score > best:
+                best = score
+                best_move = candidate
+                if best > a:
+                    a = best
+                    if a >= high:
+                        break
+
+        if best <= low:
+            # Failed low: the value is at most best (and at least lower).
+            best = max(best, lower)
+            upper = min(upper, best)
+            if move is None and lower == LOSS:
+                move = transform(best_move, t, size)
+        else:
+            lower = best
+            if best < high:
+                upper = best
+            move = transform(best_move, t, size)
+        self.memo[key] = (lower, upper, move)
+        return best
+
+
+def build_table(size, plies, node_limit=None, log=print):
+    """Solve the positions of the first `plies` plies of perfect AI play; returns (entries, solver).
+
+    Games where either side moves first are covered. entries maps
+    canonical keys to (move, value); positions the solver could not
+    settle within node_limit nodes are left out.
+    """
+    solver = Solver(node_limit)
+    empty = BitBoard(size)
+    frontier = [empty]
+    for move in empty.get_available_moves():
+        board = empty.copy()
+        board.push(move, HUMAN)
+        frontier.append(board)
+
+    entries = {}
+    seen = set()
+    start = time.time()
+    while frontier:
+        board = frontier.pop()
+        key, t = canonical_key(board)
+        if key in seen:
+            continue
+        seen.add(key)
+        result = solver.best_move(board)
+        if result is None:
+            continue
+        move, value = result
+        entries[key] = (transform(move, t, size), value)
+        board.push(move, AI)
+        if len(board.moves) < plies and not board.is_game_over():
+            for reply in board.get_available_moves():
+                child = board.copy()
+                child.push(reply, HUMAN)
+                if not child.is_game_over():
+                    frontier.append(child)
+        if len(seen) % 1000 == 0:
+            log(f"{len(seen)} positions, {solver.total_nodes} nodes, {time.time() - start:.0f}s")
+    return entries, solver
+
+
+def random_positions(size, count, rng):
+    """`count` random positions with AI to move, from random play."""
+    positions = []
+    while len(positions) < count:
+        board = BitBoard(size)
+        player = rng.choice([AI, HUMAN])
+        for _ in range(rng.randint(0, size * size - 1)):
+            if board.is_game_over():
+                break
+            board.push(rng.choice(board.get_available_moves()), player)
+            player = opponent(player)
+        if board.is_game_over():
+            continue
+        positions.append(board if player == AI else board.swapped())
+    return positions
+
+
+def audit(spec, size, count=200, seed=0, node_limit=None, log=print):
+    """Check an engine against the solver on random positions; returns the misplayed ones.
+
+    A misplay is a move that leaves the engine's side worse off than the
+    position's exact value. Returns a list of (board, move, value, value after move).
+    """
+    solver = Solver(node_limit)
+    engine = create_engine(spec)
+    mistakes = []
+    for board in random_positions(size, count, random.Random(seed)):
+        value = solver.solve(board)
+        move = engine.get_move(board)
+        if value is None or move is None:
+            continue
+        board.push(move, AI)
+        reply = solver.solve(board, HUMAN)
+        board.pop()
+        if reply is not None and -reply < value:
+            mistakes.append((board, move, value, -reply))
+            log(f"{spec} plays {move} in a {VALUE_NAMES[value]} for a {VALUE_NAMES[-reply]}: {board.moves}")
+    return mistakes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve small Gomoku boards exactly.")
+    parser.add_argument('--size', type=int, default=5)
+    parser.add_argument('--plies', type=int, default=5, help="plies of perfect play to store")
+    parser.add_argument('--node-limit', type=int, help="solver nodes allowed per position")
+    parser.add_argument('--output', help="table file (default: the installed table for the size)")
+    parser.add_argument('--audit', metavar='SPEC',
+                        help="instead of building a table, check engine SPEC against the solver")
+    parser.add_argument('--positions', type=int, default=200, help="positions to audit")
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    if args.audit:
+        mistakes = audit(args.audit, args.size, args.positions, node_limit=args.node_limit)
+        print(f"{len(mistakes)} of {args.positions} positions misplayed ({time.time() - start:.1f}s)")
+        return
+
+    entries, solver = build_table(args.size, args.plies, args.node_limit)
+    value = solver.solve(BitBoard(args.size))
+    if value is not None:
+        print(f"The empty {args.size}x{args.size} board is a {VALUE_NAMES[value]} for the first player")
+    output = args.output or solved_path(args.size)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    PositionTable.write(output, args.size, entries)
+    print(f"Wrote {len(entries)} positions to {output} in {time.time() - start:.1f}s "
+          f"({solver.total_nodes} solver nodes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+from utils.constants import AI, HUMAN
+from utils.zobrist import zobrist_table
+
+# The 8 symmetries of a square board as (row, col) -> (row, col) maps on a
+# board of side n. INVERSE[t] undoes TRANSFORMS[t].
+TRANSFORMS = [
+    lambda r, c, n: (r, c),
+    lambda r, c, n: (c, n - 1 - r),          # rotate 90
+    lambda r, c, n: (n - 1 - r, n - 1 - c),  # rotate 180
+    lambda r, c, n: (n - 1 - c, r),          # rotate 270
+    lambda r, c, n: (r, n - 1 - c),          # mirror columns
+    lambda r, c, n: (n - 1 - r, c),          # mirror rows
+    lambda r, c, n: (c, r),                  # transpose
+    lambda r, c, n: (n - 1 - c, n - 1 - r),  # anti-transpose
+]
+INVERSE = [0, 3, 2, 1, 4, 5, 6, 7]
+
+
+def transform(move, t, size):
+    return TRANSFORMS[t](move[0], move[1], size)
+
+
+_tables = {}
+
+
+def symmetric_tables(size):
+    """Zobrist tables per symmetry: tables[t][player][cell] keys a stone at cell mapped by TRANSFORMS[t]."""
+    if size not in _tables:
+        table = zobrist_table(size)
+        _tables[size] = [
+            {
+                player: [table[player][r * size + c] for r, c in (f(i // size, i % size, size) for i in range(size * size))]
+                for player in (AI, HUMAN)
+            }
+            for f in TRANSFORMS
+        ]
+    return _tables[size]
+
+
+def canonical_key(board, swap=False):
+    """Smallest Zobrist key of `board` over the 8 symmetries, and the symmetry giving it.
+
+    Positions that are rotations or reflections of each other share a key;
+    a move stored in the canonical frame maps back to this board with
+    transform(move, INVERSE[t], size). With swap=True the key is that of
+    the board with the colours exchanged.
+    """
+    size = board.size
+    other = {AI: HUMAN, HUMAN: AI}
+    stones = [(row * size + col, other[player] if swap else player) for row, col, player in board.stones()]
+    best_key = None
+    best_t = 0
+    for t, tables in enumerate(symmetric_tables(size)):
+        key = 0
+        for cell, player in stones:
+            key ^= tables[player][cell]
+        if best_key is None or key < best_key:
+            best_key = key
+            best_t = t
+    return best_key, best_t
+
+
+class SymmetricKeys:
+    """The 8 symmetric Zobrist keys of a position, updated stone by stone.
+
+    canonical() gives the same result as canonical_key() on the position
+    without rescanning the board.
+    """
+
+    def __init__(self, board):
+        self.tables = symmetric_tables(board.size)
+        self.size = board.size
+        self.keys = [0] * len(TRANSFORMS)
+        self.swapped = [0] * len(TRANSFORMS)
+        for row, col, player in board.stones():
+            self.toggle(row, col, player)
+
+    def toggle(self, row, col, player):
+        """Add the stone at (row, col), or remove it if it is there."""
+        cell = row * self.size + col
+        other = HUMAN if player == AI else AI
+        keys = self.keys
+        swapped = self.swapped
+        for t, tables in enumerate(self.tables):
+            keys[t] ^= tables[player][cell]
+            swapped[t] ^= tables[other][cell]
+
+    def canonical(self, swap=False):
+        keys = self.swapped if swap else self.keys
+        key = min(keys)
+        return key, keys.index(key)
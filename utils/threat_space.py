@@ -0,0 +1,223 @@
+from utils.constants import AI, HUMAN
+from utils.evaluator import AI_CODE, CODES, HUMAN_CODE, SEGMENT_LENGTH, segment_pattern
+from utils.search_control import SearchTimeout
+
+# Attacker moves searched by default: a VCF is a string of fours, so 15
+# attacker moves (30 plies) covers nearly every practical sequence.
+VCF_DEPTH = 15
+VCT_DEPTH = 5
+NODE_LIMIT = 20000
+# Nodes between calls to out_of_time. Each node scans the board for
+# threats, so nodes are far slower than alpha-beta nodes and the clock is
+# read more often than CHECK_INTERVAL.
+THREAT_CHECK_INTERVAL = 16
+# Six-cell segment codes (see IncrementalEvaluator.codes) holding an open
+# three, by side code.
+OPEN_THREES = {
+    side: frozenset(code for code in range(3 ** SEGMENT_LENGTH) if segment_pattern(code) == ('open_three', side))
+    for side in (AI_CODE, HUMAN_CODE)
+}
+
+
+def opponent(player):
+    return HUMAN if player == AI else AI
+
+
+def _window_points(board, player, own_count):
+    """Empty cells of windows holding `own_count` stones of `player` and none of the opponent."""
+    evaluator = board.evaluator
+    if player == AI:
+        own_counts, opp_counts = evaluator.ai_counts, evaluator.human_counts
+    else:
+        own_counts, opp_counts = evaluator.human_counts, evaluator.ai_counts
+    occupied = board.occupied
+    points = []
+    seen = set()
+    windows = evaluator.windows
+    for w in range(len(windows)):
+        if own_counts[w] == own_count and not opp_counts[w]:
+            for cell in windows[w]:
+                if not occupied[cell] and cell not in seen:
+                    seen.add(cell)
+                    points.append(cell)
+    size = board.size
+    return [divmod(cell, size) for cell in sorted(points)]
+
+
+def open_three_segments(board, move, player):
+    """Six-cell segments through the empty cell `move` that hold an open three once `player` plays there."""
+    evaluator = board.evaluator
+    side = CODES[player]
+    codes = evaluator.codes
+    open_threes = OPEN_THREES[side]
+    return [
+        s for s, power in evaluator.cell_segments[move[0] * board.size + move[1]]
+        if codes[s] + side * power in open_threes
+    ]
+
+
+def five_points(board, player):
+    """Cells where `player` would complete five."""
+    return _window_points(board, player, 4)
+
+
+def four_points(board, player):
+    """Cells where `player` would make a four (a window one stone short of five)."""
+    return _window_points(board, player, 3)
+
+
+def three_points(board, player):
+    """Cells where `player` would make a three with both remaining cells empty."""
+    return _window_points(board, player, 2)
+
+
+class ThreatSpaceSearch:
+    """Forced-win search that only expands threats and their forced replies.
+
+    find_vcf() looks for a victory by continuous fours: every attacker move
+    makes a four, so the defender's reply is forced. find_vct() also allows
+    open threes (the evaluator's 'open_three' segment patterns), answered
+    by every empty cell of the open-three segments, the attacker's four
+    points and the defender's own fours: any other reply lets the attacker
+    make an open four. Both return the winning line as a list
+    of alternating attacker/defender moves starting with the attacker's,
+    or None. The searches work on the board in place and leave it as they
+    found it.
+
+    If `out_of_time` is set to a function returning True once the search
+    must stop, it is called every THREAT_CHECK_INTERVAL nodes and the
+    search raises SearchTimeout, leaving the board as it found it.
+    """
+
+    def __init__(self, vcf_depth=VCF_DEPTH, vct_depth=VCT_DEPTH, node_limit=NODE_LIMIT, out_of_time=None):
+        self.vcf_depth = vcf_depth
+        self.vct_depth = vct_depth
+        self.node_limit = node_limit
+        self.out_of_time = out_of_time
+        self.nodes = 0
+
+    def find_vcf(self, board, player, max_depth=None):
+        self.nodes = 0
+        self._failed = {}
+        depth = self.vcf_depth if max_depth is None else max_depth
+        return self._search(board, player, depth, False)
+
+    def find_vct(self, board, player, max_depth=None):
+        self.nodes = 0
+        self._failed = {}
+        depth = self.vct_depth if max_depth is None else max_depth
+        return self._search(board, player, depth, True)
+
+    def _search(self, board, attacker, depth, allow_threes):
+        if board.winner is not None:
+            return None
+        wins = five_points(board, attacker)
+        if wins:
+            return [wins[0]]
+        if depth == 0 or self.nodes >= self.node_limit:
+            return None
+        key = (board.hash, attacker)
+        if self._failed.get(key, -1) >= depth:
+            return None
+        self.nodes += 1
+        if (self.out_of_time is not None and not self.nodes & (THREAT_CHECK_INTERVAL - 1)
+                and self.out_of_time()):
+            raise SearchTimeout
+
+        defender = opponent(attacker)
+        must_block = five_points(board, defender)
+        if len(must_block) > 1:
+            self._failed[key] = depth
+            return None
+
+        fours = four_points(board, attacker)
+        threes = {}
+        if allow_threes:
+            for move in three_points(board, attacker):
+                segments = open_three_segments(board, move, attacker)
+                if segments:
+                    threes[move] = segments
+        if must_block:
+            # The only legal try is the block, and it must keep the initiative.
+            block = must_block[0]
+            fours = [block] if block in fours else []
+            threes = {block: threes[block]} if block in threes else {}
+
+        evaluator = board.evaluator
+        for move in sorted(fours, key=lambda m: -evaluator.threat_score(m[0], m[1], attacker)):
+            line = self._try_four(board, attacker, move, depth, allow_threes)
+            if line is not None:
+                return line
+        for move in sorted(threes, key=lambda m: -evaluator.threat_score(m[0], m[1], attacker)):
+            if move in fours:
+                continue
+            line = self._try_three(board, attacker, move, depth, threes[move])
+            if line is not None:
+                return line
+
+        self._failed[key] = depth
+        return None
+
+    def _try_four(self, board, attacker, move, depth, allow_threes):
+        defender = opponent(attacker)
+        board.push(move, attacker)
+        try:
+            replies = five_points(board, attacker)
+            if len(replies) > 1:
+                # Open four or double four: no single reply stops both.
+                return [move, replies[0], replies[1]]
+            if not replies:
+                return None
+            reply = replies[0]
+            board.push(reply, defender)
+            try:
+                if board.winner == defender:
+                    return None
+                line = self._search(board, attacker, depth - 1, allow_threes)
+            finally:
+                board.pop()
+            if line is not None:
+                return [move, reply] + line
+            return None
+        finally:
+            board.pop()
+
+    def _try_three(self, board, attacker, move, depth, segments):
+        defender = opponent(attacker)
+        board.push(move, attacker)
+        try:
+            defences = set(four_points(board, attacker)) | set(five_points(board, attacker))
+            defences |= set(four_points(board, defender))
+            occupied = board.occupied
+            for s in segments:
+                for cell in board.evaluator.segments[s]:
+                    if not occupied[cell]:
+                        defences.add(divmod(cell, board.size))
+            if not defences:
+                return None
+            best_line = None
+            for reply in sorted(defences):
+                board.push(reply, defender)
+                try:
+                    if board.winner == defender:
+                        return None
+                    line = self._search(board, attacker, depth - 1, True)
+                finally:
+                    board.pop()
+                if line is None:
+                    return None
+                if best_line is None:
+                    best_line = [reply] + line
+            return [move] + best_line
+        finally:
+            board.pop()
+
+
+def find_vcf(board, player, max_depth=VCF_DEPTH, node_limit=NODE_LIMIT):
+    """Winning line of continuous fours for `player`, or None."""
+    return ThreatSpaceSearch(node_limit=node_limit).find_vcf(board, player, max_depth)
+
+
+def find_vct(board, player, max_depth=VCT_DEPTH, node_limit=NODE_LIMIT):
+    """Winning line of continuous fours and threes for `player`, or None."""
+    return ThreatSpaceSearch(node_limit=node_limit).find_vct(board, player, max_depth)
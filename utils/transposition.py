@@ -0,0 +1,76 @@
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Rough CPython cost of one stored slot: the key int, the entry tuple and
+# its contents, plus the two list pointers.
+SLOT_BYTES = 160
+
+
+class TranspositionTable:
+    """Fixed-size table of search results keyed by Zobrist hash.
+
+    Every bucket has two slots: a depth-preferred slot that is only
+    replaced by an equal or deeper search (or the same position), and an
+    always-replace slot that takes everything else. Entries are
+    (depth, score, flag, move) tuples where flag is EXACT, LOWER or UPPER.
+    """
+
+    def __init__(self, size_mb=16):
+        self.size_mb = size_mb
+        self.buckets = max(1, int(size_mb * 1024 * 1024) // (2 * SLOT_BYTES))
+        self.clear()
+
+    def clear(self):
+        self.keys = [None] * (2 * self.buckets)
+        self.entries = [None] * (2 * self.buckets)
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def probe(self, key):
+        index = (key % self.buckets) << 1
+        keys = self.keys
+        if keys[index] == key:
+            self.hits += 1
+            return self.entries[index]
+        if keys[index + 1] == key:
+            self.hits += 1
+            return self.entries[index + 1]
+        self.misses += 1
+        if keys[index] is not None or keys[index + 1] is not None:
+            self.collisions += 1
+        return None
+
+    def store(self, key, depth, score, flag, move):
+        index = (key % self.buckets) << 1
+        keys = self.keys
+        entries = self.entries
+        self.stores += 1
+        if keys[index] is None or keys[index] == key or depth >= entries[index][0]:
+            if keys[index] is not None and keys[index] != key:
+                # Demote the replaced entry instead of dropping it.
+                keys[index + 1] = keys[index]
+                entries[index + 1] = entries[index]
+            keys[index] = key
+            entries[index] = (depth, score, flag, move)
+        else:
+            keys[index + 1] = key
+            entries[index + 1] = (depth, score, flag, move)
+
+    def stats(self):
+        probes = self.hits + self.misses
+        used = sum(1 for key in self.keys if key is not None)
+        return {
+            'size_mb': self.size_mb,
+            'slots': 2 * self.buckets,
+            'used': used,
+            'fill': used / (2 * self.buckets),
+            'probes': probes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'collisions': self.collisions,
+            'stores': self.stores,
+            'hit_rate': self.hits / probes if probes else 0.0,
+        }
@@ -0,0 +1,199 @@
+"""Texel-style tuning of the evaluator weights on self-play data.
+
+The evaluator is linear in its weights: utility() of a position without a
+five is pattern_features() . weight_vector(). The tuner extracts the
+features of every position in a self-play directory once, into a
+memory-mapped features.npy next to the data, and then fits the weights
+so that sigmoid(K * utility) predicts the game results (1 for a white
+win, 0 for a black win, 1/2 for a draw):
+
+1. K is fitted with the current weights, which fixes the scale of the
+   scores; the tuned weights stay comparable to the constants around them
+   (win scores, move-ordering bonuses, MCTS rollout scale).
+2. The weights are fitted by Newton's method on the logistic loss, with
+   an L2 penalty pulling them back towards the current weights so that
+   rare patterns keep their hand-picked values.
+
+Every step is a pass of matrix products over the feature matrix in
+blocks, so millions of positions take minutes:
+
+    python -m utils.tuner data/selfplay_15 --output weights/evaluator.json
+
+The evaluator loads weights/evaluator.json at startup (see
+utils.evaluator.WEIGHTS_PATH). Needs NumPy.
+"""
+import argparse
+import json
+import math
+import os
+import time
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+import utils.evaluator as evaluator
+from self_play import SelfPlayData
+from utils.batch_evaluator import FEATURE_NAMES, STONE_COUNTS, pattern_features, weight_vector
+from utils.evaluator import SEGMENT_PATTERNS, WEIGHTS_PATH
+
+# Positions per block when extracting features and during the fit.
+BLOCK = 1 << 16
+ITERATIONS = 20
+L2 = 1e-3
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("the tuner needs NumPy: pip install numpy")
+
+
+def extract_features(data, block=BLOCK):
+    """(features, targets) of every position in `data`, cached in features.npy and targets.npy."""
+    _require_numpy()
+    features_path = os.path.join(data.path, 'features.npy')
+    targets_path = os.path.join(data.path, 'targets.npy')
+    if os.path.exists(features_path) and os.path.exists(targets_path):
+        features = np.load(features_path, mmap_mode='r')
+        if features.shape == (len(data), len(FEATURE_NAMES)):
+            return features, np.load(targets_path, mmap_mode='r')
+
+    features = np.lib.format.open_memmap(
+        features_path, mode='w+', dtype=np.float32, shape=(len(data), len(FEATURE_NAMES))
+    )
+    targets = np.lib.format.open_memmap(targets_path, mode='w+', dtype=np.float32, shape=(len(data),))
+    row = 0
+    for chunk in data:
+        boards = data.boards(chunk)
+        for start in range(0, len(boards), block):
+            end = min(start + block, len(boards))
+            features[row + start:row + end] = pattern_features(boards[start:end])
+        targets[row:row + len(boards)] = (chunk['result'] + 1) / 2
+        row += len(boards)
+    features.flush()
+    targets.flush()
+    return features, targets
+
+
+def _blocks(features, targets, block):
+    for start in range(0, len(features), block):
+        yield np.asarray(features[start:start + block], dtype=np.float64), np.asarray(targets[start:start + block])
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -50, 50)))
+
+
+def loss(features, targets, theta, block=BLOCK):
+    """Mean logistic loss of the predictions sigmoid(features . theta)."""
+    total = 0.0
+    for x, y in _blocks(features, targets, block):
+        p = np.clip(_sigmoid(x @ theta), 1e-12, 1 - 1e-12)
+        total -= np.sum(y * np.log(p) + (1 - y) * np.log(1 - p))
+    return total / len(features)
+
+
+def fit_scale(features, targets, weights, block=BLOCK):
+    """The K minimizing the loss of sigmoid(K * utility) with the given weights."""
+    weights = np.asarray(weights, dtype=np.float64)
+    low, high = math.log(1e-7), math.log(1e-1)
+    # Golden-section search over log K.
+    ratio = (math.sqrt(5) - 1) / 2
+    a = high - ratio * (high - low)
+    b = low + ratio * (high - low)
+    loss_a = loss(features, targets, math.exp(a) * weights, block)
+    loss_b = loss(features, targets, math.exp(b) * weights, block)
+    for _ in range(40):
+        if loss_a < loss_b:
+            high, b, loss_b = b, a, loss_a
+            a = high - ratio * (high - low)
+            loss_a = loss(features, targets, math.exp(a) * weights, block)
+        else:
+            low, a, loss_a = a, b, loss_b
+            b = low + ratio * (high - low)
+            loss_b = loss(features, targets, math.exp(b) * weights, block)
+    return math.exp((low + high) / 2)
+
+
+def fit(features, targets, weights, scale, iterations=ITERATIONS, l2=L2, block=BLOCK, log=None):
+    """Weights minimizing the logistic loss plus l2 * |theta - theta0|^2 / 2, theta = scale * weights."""
+    prior = scale * np.asarray(weights, dtype=np.float64)
+    theta = prior.copy()
+    count = len(features)
+    penalty = lambda t: 0.5 * l2 * np.sum((t - prior) ** 2)
+    current = loss(features, targets, theta, block) + penalty(theta)
+    for iteration in range(iterations):
+        gradient = l2 * (theta - prior)
+        hessian = l2 * np.eye(len(theta))
+        for x, y in _blocks(features, targets, block):
+            p = _sigmoid(x @ theta)
+            gradient += x.T @ (p - y) / count
+            hessian += (x.T * (p * (1 - p))) @ x / count
+        step = np.linalg.solve(hessian, gradient)
+        # Halve the step until the loss goes down.
+        for _ in range(20):
+            candidate = theta - step
+            value = loss(features, targets, candidate, block) + penalty(candidate)
+            if value <= current:
+                break
+            step /= 2
+        else:
+            break
+        improvement = current - value
+        theta, current = candidate, value
+        if log:
+            log(f"iteration {iteration + 1}: loss {current:.6f}")
+        if improvement < 1e-9:
+            break
+    return theta / scale
+
+
+def weights_file(weights):
+    """The weights file contents for a vector in FEATURE_NAMES order, rounded to integers."""
+    values = dict(zip(FEATURE_NAMES, (int(round(w)) for w in weights)))
+    ai_window = list(evaluator.AI_WINDOW_WEIGHTS)
+    human_window = list(evaluator.HUMAN_WINDOW_WEIGHTS)
+    for n in STONE_COUNTS:
+        ai_window[n] = values[f'ai_window_{n}']
+        human_window[n] = values[f'human_window_{n}']
+    return {
+        'ai_window': ai_window,
+        'human_window': human_window,
+        'segments': {name: [values[f'ai_{name}'], values[f'human_{name}']] for name in SEGMENT_PATTERNS},
+        'center': values['center'],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit the evaluator weights to self-play results.")
+    parser.add_argument('data', help="self-play data directory (see self_play.py)")
+    parser.add_argument('--output', default=WEIGHTS_PATH, help="weights file to write")
+    parser.add_argument('--iterations', type=int, default=ITERATIONS)
+    parser.add_argument('--l2', type=float, default=L2, help="pull towards the current weights")
+    parser.add_argument('--block', type=int, default=BLOCK, help="positions per block")
+    args = parser.parse_args(argv)
+
+    _require_numpy()
+    data = SelfPlayData(args.data)
+    start = time.time()
+    features, targets = extract_features(data, args.block)
+    print(f"Features of {len(features)} positions in {time.time() - start:.1f}s")
+
+    weights = weight_vector()
+    scale = fit_scale(features, targets, weights, args.block)
+    print(f"K = {scale:.3g}, loss with the current weights {loss(features, targets, scale * np.asarray(weights), args.block):.6f}")
+    tuned = fit(features, targets, weights, scale, args.iterations, args.l2, args.block, log=print)
+    for name, old, new in zip(FEATURE_NAMES, weights, tuned):
+        print(f"{name:<22}{old:>10}{new:>12.1f}")
+
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(weights_file(tuned), f, indent=2)
+    print(f"Wrote {args.output} in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
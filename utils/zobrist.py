@@ -0,0 +1,29 @@
+import random
+
+from utils.constants import HUMAN, AI
+
+# Fixed seed so position keys are stable between runs and processes.
+SEED = 0x5EED_60B0
+
+_rng = random.Random(SEED)
+SIDE_KEY = _rng.getrandbits(64)
+
+_tables = {}
+
+def zobrist_table(size):
+    """Per-player lists of random 64-bit keys, indexed by row * size + col."""
+    if size not in _tables:
+        rng = random.Random(SEED + size)
+        _tables[size] = {
+            HUMAN: [rng.getrandbits(64) for _ in range(size * size)],
+            AI: [rng.getrandbits(64) for _ in range(size * size)],
+        }
+    return _tables[size]
+
+def zobrist_hash(size, stones):
+    """Key of the position holding `stones` ((row, col, player) triples)."""
+    table = zobrist_table(size)
+    key = 0
+    for row, col, player in stones:
+        key ^= table[player][row * size + col]
+    return key